@@ -1,8 +1,14 @@
+import os
+
 from dash_iconify import DashIconify
 import dash_mantine_components as dmc
-from dash import Dash, dcc, callback, Output, Input
+from dash import Dash, dcc, callback, ClientsideFunction, Output, Input
 
-from utils import SURVEY_REGISTRY, FIELD_TYPES, load_transform_data, prepare_bar_data
+from cache import DiskBackend, ResponseCache
+from models import BitmapIndex, CrosstabCube
+from store import build_id
+from utils import (SURVEY_FILEPATH, SURVEY_REGISTRY, FIELD_TYPES, build_bitmap_index, build_crosstab_cube,
+                   filter_crosstab_cube, load_once, load_survey_store, prepare_bar_data)
 
 
 # CONSTANTS
@@ -10,24 +16,122 @@ from utils import SURVEY_REGISTRY, FIELD_TYPES, load_transform_data, prepare_bar
 OPACITY = 0.65
 REF_LINE_COLOR = 'rgba(255, 255, 255, 0.85)'
 
+# Chart outputs only depend on the selections, which have a few hundred possible values
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_DIR = os.getenv('Y25W23_RESPONSE_CACHE_DIR')  # Set to share cached outputs between workers
+FILTERED_CUBE_CACHE_SIZE = 32
+
+# Respondent filters are `dmc.MultiSelect` values like 'Gender|Female'
+FILTER_SEPARATOR = '|'
+
+# 'server' answers each control change with one request; 'clientside' ships every
+# chart output with the layout so control changes never reach the server
+CALLBACK_MODE = os.getenv('Y25W23_CALLBACK_MODE', 'server')
+
 
 # DATA
 # -----------------------------------------------------------------------------
-df = load_transform_data()
+@load_once
+def get_cube() -> CrosstabCube:
+    """Loaded on first use rather than at import, so importing this module stays cheap"""
+    return build_crosstab_cube(load_survey_store().codes)
+
+
+@load_once
+def get_bitmaps() -> BitmapIndex:
+    return build_bitmap_index(load_survey_store().codes)
+
+
+def reset_data() -> None:
+    get_cube.reset()
+    get_bitmaps.reset()
+
+
+# Cached outputs (and the data above) are dropped whenever the survey CSV changes
+response_cache = ResponseCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    backend=DiskBackend(RESPONSE_CACHE_DIR, maxsize=RESPONSE_CACHE_SIZE) if RESPONSE_CACHE_DIR else None,
+    version=lambda: build_id(SURVEY_FILEPATH),
+    on_invalidate=reset_data,
+)
+
+# Filtered cubes hold NumPy arrays and count pairs lazily, so they stay in memory
+filtered_cube_cache = ResponseCache(
+    maxsize=FILTERED_CUBE_CACHE_SIZE,
+    version=lambda: build_id(SURVEY_FILEPATH),
+)
+
 
 # Initial inputs
 attribute = 'Age'
 variable = 'Steak Preparation'
 transpose = True
 show_ref = False
+filters = []
+
+
+def normalize_filters(filters: list[str] | None) -> dict[str, list[str]]:
+    """Groups filter values by field, in registry and response order"""
+    selected = set(filters or [])
+    normalized = {}
+    for name, field in SURVEY_REGISTRY.items():
+        responses = [r for r in field.responses if f"{name}{FILTER_SEPARATOR}{r}" in selected]
+        if responses:
+            normalized[name] = responses
+    return normalized
 
-# Initial outputs
-header1 = SURVEY_REGISTRY[variable].question.replace('<br>', '')
-header2 = "Broken down by respondent's " + SURVEY_REGISTRY[attribute].question.lower()
 
-data, ref = prepare_bar_data(df, attribute, variable, transpose)
-series = SURVEY_REGISTRY[variable if transpose else attribute].series_color_map(OPACITY)
-ref_lines = [{'x': r, 'color': REF_LINE_COLOR} for r in ref]
+@filtered_cube_cache.cached()
+def get_filtered_cube(filters: dict[str, list[str]]) -> CrosstabCube:
+    return filter_crosstab_cube(get_bitmaps(), filters)
+
+
+def normalize_selections(selections: dict) -> dict:
+    return {'attribute': selections['attribute'],
+            'variable': selections['variable'],
+            'transpose': bool(selections['transpose']),
+            'show_ref': bool(selections['show_ref']),
+            'filters': normalize_filters(selections.get('filters'))}
+
+
+@response_cache.cached(key=normalize_selections)
+def chart_outputs(selections: dict) -> tuple[str, str, list, list, list]:
+    """Headers and bar chart props for the selected controls"""
+    attribute = selections['attribute']
+    variable = selections['variable']
+    transpose = selections['transpose']
+    show_ref = selections['show_ref']
+    filters = normalize_filters(selections.get('filters'))
+
+    header1 = SURVEY_REGISTRY[variable].question.replace('<br>', '')
+    header2 = "Broken down by respondent's " + SURVEY_REGISTRY[attribute].question.lower()
+
+    cube = get_filtered_cube(filters) if filters else get_cube()
+    data, ref = prepare_bar_data(cube, attribute, variable, transpose)
+    series = [dict(s) for s in SURVEY_REGISTRY[variable if transpose else attribute].series_color_map(OPACITY)]
+    ref_lines = [{'x': r, 'color': REF_LINE_COLOR} for r in ref] if show_ref else []
+
+    return header1, header2, data, series, ref_lines
+
+
+def payload_key(attribute: str, variable: str, transpose: bool) -> str:
+    """Must match `updateBarChart` in `assets/clientside.js`"""
+    return f"{attribute}|{variable}|{int(bool(transpose))}"
+
+
+@response_cache.cached(key=normalize_filters)
+def chart_payload(filters: list[str] | None = None) -> dict[str, tuple]:
+    """
+    Chart outputs for every attribute/variable/transpose, reference lines included,
+    among respondents matching `filters`
+    """
+    return {
+        payload_key(a, v, t): chart_outputs({'attribute': a, 'variable': v, 'transpose': t, 'show_ref': True,
+                                             'filters': filters})
+        for a in FIELD_TYPES['attribute']
+        for v in FIELD_TYPES['variable']
+        for t in (False, True)
+    }
 
 
 # CONTENTS
@@ -54,6 +158,22 @@ slicers = dmc.Group(
             mb=8
         ),
 
+        dmc.MultiSelect(
+            id='select-filters',
+            label="Only respondents with",
+            data=[
+                {'group': name,
+                 'items': [{'value': f"{name}{FILTER_SEPARATOR}{r}", 'label': r}
+                           for r in SURVEY_REGISTRY[name].responses]}
+                for name in FIELD_TYPES['attribute']
+            ],
+            value=filters,
+            placeholder="All respondents",
+            clearable=True,
+            w=260,
+            mb=8
+        ),
+
         dmc.Stack(
             children=[
                 dmc.Checkbox(
@@ -115,140 +235,164 @@ slicers = dmc.Group(
     mb=100, pl=80, justify='space-between', align='end'
 )
 
-title = dmc.Title(
-    id='title-variable',
-    children=header1,
-    order=4,
-    pl=80,
-    pb=20
-)
-
-subtitles = dmc.Group(
-    children=[
-        dmc.Title(
-            id='title-attribute',
-            children=header2,
-            order=6,
-            pl=80
-        ),
-        dmc.Anchor(
-            "data source: fivethirtyeight",
-            href="https://github.com/fivethirtyeight/data/tree/master/steak-survey",
-            target="_blank",
-            size='sm',
-        )
-    ],
-    pb=30, justify='space-between'
-)
-
-bar_chart = dmc.BarChart(
-    id='bar-chart',
-    h=400,
-    dataKey="index",
-    data=data,
-    series=series,
-    referenceLines=ref_lines,
-    type='percent',
-    orientation='vertical',
-    yAxisProps={"width": 80},
-    tickLine="x",
-    gridAxis="y",
-    withXAxis=True,
-    withYAxis=True,
-    withLegend=True,
-    legendProps={"verticalAlign": "bottom"}
-)
+def center_col(outputs: tuple[str, str, list, list, list]) -> dmc.Stack:
+    header1, header2, data, series, ref_lines = outputs
 
-center_col = dmc.Stack(
-    children=[
-        slicers,
-        title,
-        subtitles,
-        bar_chart
-    ],
-    gap=0,
-    pt=40
-)
+    title = dmc.Title(
+        id='title-variable',
+        children=header1,
+        order=4,
+        pl=80,
+        pb=20
+    )
 
-main = dmc.Grid(
-    children=[
-        dmc.GridCol([], span=3),
-        dmc.GridCol([center_col], span=6),
-        dmc.GridCol([], span=3),
-    ],
-    gutter="xl",
-)
+    subtitles = dmc.Group(
+        children=[
+            dmc.Title(
+                id='title-attribute',
+                children=header2,
+                order=6,
+                pl=80
+            ),
+            dmc.Anchor(
+                "data source: fivethirtyeight",
+                href="https://github.com/fivethirtyeight/data/tree/master/steak-survey",
+                target="_blank",
+                size='sm',
+            )
+        ],
+        pb=30, justify='space-between'
+    )
+
+    bar_chart = dmc.BarChart(
+        id='bar-chart',
+        h=400,
+        dataKey="index",
+        data=data,
+        series=series,
+        referenceLines=ref_lines,
+        type='percent',
+        orientation='vertical',
+        yAxisProps={"width": 80},
+        tickLine="x",
+        gridAxis="y",
+        withXAxis=True,
+        withYAxis=True,
+        withLegend=True,
+        legendProps={"verticalAlign": "bottom"}
+    )
+
+    return dmc.Stack(
+        children=[
+            slicers,
+            title,
+            subtitles,
+            bar_chart
+        ],
+        gap=0,
+        pt=40
+    )
 
 
 # LAYOUT
 # -----------------------------------------------------------------------------
-layout = dmc.AppShell([
-    dmc.AppShellMain(
+def build_layout(outputs: tuple[str, str, list, list, list], payload: dict | None = None) -> dmc.MantineProvider:
+    main = dmc.Grid(
         children=[
-            dcc.Store(
-                id='store-selections',
-                data={
-                    'attribute': attribute,
-                    'variable': variable,
-                    'transpose': transpose,
-                    'show_ref': show_ref
-                }
-            ),
-            main
-        ]
-    ),
-])
+            dmc.GridCol([], span=3),
+            dmc.GridCol([center_col(outputs)], span=6),
+            dmc.GridCol([], span=3),
+        ],
+        gutter="xl",
+    )
+
+    layout = dmc.AppShell([
+        dmc.AppShellMain(
+            children=[
+                dcc.Store(
+                    id='store-chart-payload',
+                    data=payload
+                ),
+                main
+            ]
+        ),
+    ])
+
+    return dmc.MantineProvider(
+        children=layout,
+        forceColorScheme="dark",
+        theme = {'primaryColor': 'gray'},
+    )
+
+
+initial_selections = {
+    'attribute': attribute,
+    'variable': variable,
+    'transpose': transpose,
+    'show_ref': show_ref,
+    'filters': filters
+}
+
+
+def serve_layout() -> dmc.MantineProvider:
+    """Evaluated per page load by Dash; the first call loads the survey data"""
+    payload = chart_payload(filters) if CALLBACK_MODE == 'clientside' else None
+    return build_layout(chart_outputs(initial_selections), payload)
 
 
 # APP
 # -----------------------------------------------------------------------------
 app = Dash()
 app.title = 'FigureFriday Y25W23'
-app.layout = dmc.MantineProvider(
-    children=layout,
-    forceColorScheme="dark",
-    theme = {'primaryColor': 'gray'},
-)
+
+# Dash evaluates a layout function once to validate callbacks unless it is given
+# a validation layout, so provide one that has every component but no data
+app.validation_layout = build_layout(('', '', [], [], []))
+app.layout = serve_layout
 
 
 # CALLBACKS
 # -----------------------------------------------------------------------------
-@callback(
-    Output('store-selections', 'data'),
-    Input('select-variable', 'value'),
-    Input('select-attribute', 'value'),
-    Input('checkbox-transpose', 'checked'),
-    Input('checkbox-lines', 'checked')
-)
-def update_store(variable, attribute, transpose, show_ref):
-    return {'attribute': attribute,
-            'variable': variable,
-            'transpose': transpose,
-            'show_ref': show_ref}
-
-
-@callback(
+chart_callback_outputs = [
     Output('title-variable', 'children'),
     Output('title-attribute', 'children'),
     Output('bar-chart', 'data'),
     Output('bar-chart', 'series'),
     Output('bar-chart', 'referenceLines'),
-    Input('store-selections', 'data'),
-)
-def update_bar_chart(store_data):
-    attribute = store_data['attribute']
-    variable = store_data['variable']
-    transpose = store_data['transpose']
-    show_ref = store_data['show_ref']
+]
 
-    header1 = SURVEY_REGISTRY[variable].question.replace('<br>', '')
-    header2 = "Broken down by respondent's " + SURVEY_REGISTRY[attribute].question.lower()
-
-    data, ref = prepare_bar_data(df, attribute, variable, transpose)
-    series = SURVEY_REGISTRY[variable if transpose else attribute].series_color_map(OPACITY)
-    ref_lines = [{'x': r, 'color': REF_LINE_COLOR} for r in ref] if show_ref else []
-
-    return header1, header2, data, series, ref_lines
+chart_callback_inputs = [
+    Input('select-variable', 'value'),
+    Input('select-attribute', 'value'),
+    Input('checkbox-transpose', 'checked'),
+    Input('checkbox-lines', 'checked')
+]
+
+if CALLBACK_MODE == 'clientside':
+    # Only changing the respondent filters needs the server, to recompute the payload
+    @callback(
+        Output('store-chart-payload', 'data'),
+        Input('select-filters', 'value'),
+        prevent_initial_call=True
+    )
+    def update_chart_payload(filters):
+        return chart_payload(filters)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='y25w23', function_name='updateBarChart'),
+        *chart_callback_outputs,
+        *chart_callback_inputs,
+        Input('store-chart-payload', 'data'),
+    )
+
+else:
+    @callback(*chart_callback_outputs, *chart_callback_inputs, Input('select-filters', 'value'))
+    def update_bar_chart(variable, attribute, transpose, show_ref, filters):
+        return chart_outputs({'attribute': attribute,
+                              'variable': variable,
+                              'transpose': transpose,
+                              'show_ref': show_ref,
+                              'filters': filters})
 
 
 # SERVER
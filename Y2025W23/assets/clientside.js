@@ -0,0 +1,12 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+  y25w23: {
+    // Picks precomputed outputs from the payload shipped with the layout; see
+    // `chart_payload` and `payload_key` in app.py
+    updateBarChart: (variable, attribute, transpose, showRef, payload) => {
+      const key = [attribute, variable, transpose ? 1 : 0].join("|");
+      const [header1, header2, data, series, refLines] = payload[key];
+
+      return [header1, header2, data, series, showRef ? refLines : []];
+    },
+  },
+});
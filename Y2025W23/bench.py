@@ -0,0 +1,232 @@
+"""
+Standalone benchmarks for the Y25W23 app. Run from the repository root so the
+default data paths resolve, e.g. `python Y2025W23/bench.py --repeat 10 --output bench.json`.
+Results are written as JSON, tagged with the git commit and package versions so runs
+from different versions of the app can be compared.
+"""
+import argparse
+import datetime
+import importlib.metadata
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+APP_DIR = Path(__file__).resolve().parent
+
+BENCHMARKS = ['import', 'load', 'prepare', 'callback']
+SCALES = [1, 100, 10_000]  # Multiples of the survey's respondent count
+PACKAGES = ['dash', 'dash-mantine-components', 'numpy', 'pandas', 'pyarrow']
+
+# Synthetic respondents skip each question at about the survey's own rate
+MISSING_RATE = 0.05
+GENERATE_CHUNKSIZE = 100_000  # Synthetic rows written to the CSV at a time
+
+# Runs in a fresh interpreter so nothing is already imported or loaded
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {app_dir!r})
+
+t0 = time.perf_counter()
+import dash, dash_iconify, dash_mantine_components
+t1 = time.perf_counter()
+import app
+t2 = time.perf_counter()
+app.serve_layout()
+t3 = time.perf_counter()
+
+print(t1 - t0, t2 - t1, t3 - t2)
+"""
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    return {'min': min(samples),
+            'median': statistics.median(samples),
+            'max': max(samples),
+            'repeat': len(samples)}
+
+
+def timed(func, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def run_info() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=APP_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {'commit': commit,
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'packages': {name: importlib.metadata.version(name) for name in PACKAGES}}
+
+
+def write_synthetic_survey(filepath: str | Path, num_rows: int, seed: int = 0) -> None:
+    """
+    Writes `num_rows` synthetic respondents in the same layout as the survey CSV, with
+    responses drawn uniformly from each field in `SURVEY_REGISTRY`
+    """
+    import pandas as pd
+    from store import INDEX_NAME
+    from utils import SURVEY_REGISTRY
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_rows, GENERATE_CHUNKSIZE):
+        size = min(GENERATE_CHUNKSIZE, num_rows - start)
+        chunk = {INDEX_NAME: np.arange(start, start + size)}
+        for field in SURVEY_REGISTRY.values():
+            responses = np.array(list(field.responses) + [''], dtype=object)  # Empty cells are read as NaN
+            codes = rng.integers(len(field.responses), size=size)
+            codes[rng.random(size) < MISSING_RATE] = -1
+            chunk[field.question] = responses[codes]
+
+        pd.DataFrame(chunk).to_csv(filepath, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def bench_load(scales: list[int] = SCALES, repeat: int = 5) -> dict[str, dict]:
+    """
+    Times `load_transform_data` on synthetic CSVs of `scales` times the survey's size,
+    both cold (the store is compiled from the CSV) and warm (the store is up to date)
+    """
+    from store import default_store_dir, read_survey_codes
+    from utils import SURVEY_REGISTRY, load_survey_store, load_transform_data
+
+    base_rows = len(load_survey_store().index)
+
+    results = {}
+    for scale in scales:
+        num_rows = base_rows * scale
+        with tempfile.TemporaryDirectory(prefix='y25w23-bench-') as tmp_dir:
+            filepath = Path(tmp_dir) / 'steak-risk-survey.csv'
+            generate_seconds = timed(write_synthetic_survey, filepath, num_rows)
+
+            cold = []
+            for _ in range(repeat):
+                shutil.rmtree(default_store_dir(filepath), ignore_errors=True)
+                cold.append(timed(load_transform_data, filepath))
+            warm = [timed(load_transform_data, filepath) for _ in range(repeat)]
+
+            results[f'{scale}x'] = {'rows': num_rows,
+                                    'csv_bytes': filepath.stat().st_size,
+                                    'generate_seconds': generate_seconds,
+                                    'cold': summarize(cold),
+                                    'warm': summarize(warm),
+                                    # Traced separately, so tracing does not slow down the timed loads
+                                    'ingest': read_survey_codes(filepath, SURVEY_REGISTRY, trace_memory=True)[2].to_dict()}
+    return results
+
+
+def bench_prepare(repeat: int = 5) -> dict[str, dict]:
+    """Times `prepare_bar_data` for every attribute/variable/transpose combination"""
+    from utils import FIELD_TYPES, build_crosstab_cube, load_survey_store, prepare_bar_data
+
+    cube = build_crosstab_cube(load_survey_store().codes)
+
+    results = {}
+    for attribute in FIELD_TYPES['attribute']:
+        for variable in FIELD_TYPES['variable']:
+            for transpose in (False, True):
+                samples = [timed(prepare_bar_data, cube, attribute, variable, transpose) for _ in range(repeat)]
+                results[f'{attribute}|{variable}|{int(transpose)}'] = summarize(samples)
+
+    results['all'] = summarize([r['median'] for r in results.values()])
+    return results
+
+
+def bench_callback(repeat: int = 5) -> dict[str, dict]:
+    """
+    Times `update_bar_chart` end to end, i.e. a POST to `/_dash-update-component` via
+    Flask's test client, for every combination of the chart controls. Each request is
+    timed with the response cache cleared (uncached) and again right after (cached).
+    """
+    os.environ['Y25W23_CALLBACK_MODE'] = 'server'
+    os.environ.pop('Y25W23_RESPONSE_CACHE_DIR', None)
+    import app
+
+    client = app.app.server.test_client()
+    app.serve_layout()  # Loads the survey data, as on the first page load
+
+    outputs = [{'id': o.component_id, 'property': o.component_property} for o in app.chart_callback_outputs]
+    inputs = app.chart_callback_inputs + [app.Input('select-filters', 'value')]
+
+    def post(values: list) -> None:
+        response = client.post('/_dash-update-component', json={
+            'output': '..' + '...'.join(f"{o['id']}.{o['property']}" for o in outputs) + '..',
+            'outputs': outputs,
+            'inputs': [{'id': i.component_id, 'property': i.component_property, 'value': value}
+                       for i, value in zip(inputs, values)],
+            'changedPropIds': [f'{inputs[0].component_id}.{inputs[0].component_property}'],
+            'state': [],
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f"Callback failed with status {response.status_code}: {values}")
+
+    samples = {'uncached': [], 'cached': []}
+    for _ in range(repeat):
+        for attribute in app.FIELD_TYPES['attribute']:
+            for variable in app.FIELD_TYPES['variable']:
+                for transpose in (False, True):
+                    for show_ref in (False, True):
+                        values = [variable, attribute, transpose, show_ref, []]
+                        app.response_cache.clear()
+                        samples['uncached'].append(timed(post, values))
+                        samples['cached'].append(timed(post, values))
+
+    return {key: summarize(values) for key, values in samples.items()}
+
+
+def bench_import(repeat: int = 5) -> dict[str, dict]:
+    """
+    Times `import app` in fresh interpreters, separately from the Dash packages it
+    imports and from the first `serve_layout()` call (which is where the survey data
+    is now loaded, instead of at import).
+    """
+    snippet = IMPORT_SNIPPET.format(app_dir=str(APP_DIR))
+    samples = {'import_framework': [], 'import_app': [], 'first_layout': []}
+
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', snippet],
+                                capture_output=True, text=True, check=True)
+        for key, value in zip(samples, result.stdout.split()):
+            samples[key].append(float(value))
+
+    return {key: summarize(values) for key, values in samples.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help="multiples of the survey's size to time `load_transform_data` at")
+    parser.add_argument('--only', choices=BENCHMARKS, nargs='+', default=BENCHMARKS)
+    parser.add_argument('--output', type=Path, help="JSON file to write results to (default: stdout)")
+    args = parser.parse_args()
+
+    results = {'run': run_info()}
+    if 'import' in args.only:
+        results['import'] = bench_import(args.repeat)
+    if 'load' in args.only:
+        results['load_transform_data'] = bench_load(args.scales, args.repeat)
+    if 'prepare' in args.only:
+        results['prepare_bar_data'] = bench_prepare(args.repeat)
+    if 'callback' in args.only:
+        results['update_bar_chart'] = bench_callback(args.repeat)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,192 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+
+_MISSING = object()
+
+
+class DiskBackend:
+    """
+    Second-level cache shared by every worker process pointed at the same directory,
+    so a response computed by one worker is a hit for the others. Each entry is a
+    pickle file written atomically, in a subdirectory per dataset version; the
+    directory must only be writable by the app. At most `maxsize` entries are kept per
+    version, the least recently used (by file modification time) going first, and
+    `prune` drops the entries of every other version.
+    """
+    def __init__(self, directory: str | Path, maxsize: int = 256):
+        self.directory: Path = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.maxsize: int = maxsize  # Entries per version
+
+    def __repr__(self):
+        return f"DiskBackend(directory={str(self.directory)!r}, maxsize={self.maxsize})"
+
+    def _version_dir(self, version: str) -> Path:
+        return self.directory / f"v-{hashlib.sha256(version.encode()).hexdigest()[:16]}"
+
+    def _path(self, key: str, version: str) -> Path:
+        return self._version_dir(version) / f"{hashlib.sha256(key.encode()).hexdigest()}.pkl"
+
+    def get(self, key: str, version: str = '') -> Any:
+        """Cached value for `key`; raises `KeyError` when there is none"""
+        path = self._path(key, version)
+        try:
+            with open(path, 'rb') as fp:
+                value = pickle.load(fp)
+            os.utime(path)  # Recently used
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            raise KeyError(key) from None
+        return value
+
+    def set(self, key: str, value: Any, version: str = '') -> None:
+        path = self._path(key, version)
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.entry-', dir=path.parent)
+        with os.fdopen(fd, 'wb') as fp:
+            pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict(path.parent)
+
+    def _evict(self, version_dir: Path) -> None:
+        """Removes the least recently used entries of `version_dir` beyond `maxsize`"""
+        def last_used(path: Path) -> float:
+            try:
+                return path.stat().st_mtime
+            except FileNotFoundError:  # Evicted by another process meanwhile
+                return float('inf')
+
+        entries = list(version_dir.glob('*.pkl'))
+        if len(entries) > self.maxsize:
+            for path in sorted(entries, key=last_used)[:len(entries) - self.maxsize]:
+                path.unlink(missing_ok=True)
+
+    def prune(self, version: str) -> None:
+        """
+        Drops the entries of every version but `version`, e.g. after the data changed
+        (and any stored directly in the directory, as they were before versions had
+        their own subdirectories)
+        """
+        keep = self._version_dir(version)
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name.startswith('v-') and path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.suffix == '.pkl':
+                path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in self.directory.glob('v-*'):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache for callback outputs, meant for callbacks whose inputs can only
+    take a small number of values. Entries are tagged with a dataset `version`; when
+    it changes, the in-memory entries are dropped and `on_invalidate` is called (e.g.
+    to reload the data), and a shared backend drops the entries of other versions.
+
+    Cached outputs are shared between requests, so callbacks must not mutate them.
+    """
+    def __init__(self,
+                 maxsize: int = 256,
+                 backend: DiskBackend | None = None,
+                 version: Callable[[], str] | None = None,
+                 on_invalidate: Callable[[], None] | None = None):
+        self.maxsize: int = maxsize
+        self.backend: DiskBackend | None = backend
+        self.version: Callable[[], str] = version or (lambda: '')
+        self.on_invalidate: Callable[[], None] | None = on_invalidate
+
+        self.hits: int = 0  # Served from memory
+        self.backend_hits: int = 0  # Served from the shared backend
+        self.misses: int = 0  # Computed
+
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._current_version: str | None = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"ResponseCache(size={len(self._entries)}, maxsize={self.maxsize}, "
+                f"hits={self.hits}, misses={self.misses}, backend_hits={self.backend_hits})")
+
+    def info(self) -> dict[str, int]:
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'backend_hits': self.backend_hits,
+                'size': len(self._entries),
+                'maxsize': self.maxsize}
+
+    def clear(self) -> None:
+        """Drops the in-memory entries only, e.g. to time uncached calls"""
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self) -> None:
+        self.clear()
+        if self.on_invalidate:
+            self.on_invalidate()
+
+    def _check_version(self) -> str:
+        version = self.version()
+        if version != self._current_version:
+            if self._current_version is not None:
+                self.invalidate()
+            if self.backend:
+                self.backend.prune(version)  # Including what earlier runs left behind
+            self._current_version = version
+        return version
+
+    def cached(self, key: Callable[..., Hashable] | None = None) -> Callable:
+        """
+        Decorator that caches a function's return value. `key` maps the function's
+        arguments to a JSON-serializable cache key (defaults to the arguments as-is),
+        which is where inputs should be normalized.
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                version = self._check_version()
+                args_key = key(*args, **kwargs) if key else [args, kwargs]
+                cache_key = json.dumps([version, func.__qualname__, args_key], sort_keys=True)
+
+                with self._lock:
+                    if cache_key in self._entries:
+                        self._entries.move_to_end(cache_key)
+                        self.hits += 1
+                        return self._entries[cache_key]
+
+                value = _MISSING
+                if self.backend:
+                    try:
+                        value = self.backend.get(cache_key, version)
+                    except KeyError:
+                        pass
+
+                computed = value is _MISSING
+                if computed:
+                    value = func(*args, **kwargs)
+                    if self.backend:
+                        self.backend.set(cache_key, value, version)
+
+                with self._lock:
+                    if computed:
+                        self.misses += 1
+                    else:
+                        self.backend_hits += 1
+                    self._entries[cache_key] = value
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                return value
+
+            return wrapper
+        return decorator
@@ -1,18 +1,37 @@
+import re
+from types import MappingProxyType
+from typing import Callable, Mapping
+
+import numpy as np
+
+
 class ColorScheme:
-    """Store RGB color schemes with method to convert to RGBA"""
+    """
+    Store RGB color schemes with method to convert to RGBA. Colors are parsed once on
+    construction, so malformed entries fail here instead of on every request.
+    """
+    _RGB_PATTERN = re.compile(r'rgb\((\d{1,3}), (\d{1,3}), (\d{1,3})\)')
+
     def __init__(self, rgb: list[str]):
-        self.rgb: list[str] = rgb
+        self.rgb: tuple[str, ...] = tuple(rgb)
+        self.values: tuple[tuple[int, int, int], ...] = tuple(self._parse_rgb(c) for c in rgb)
+        self._rgba: dict[float, tuple[str, ...]] = {}  # Keyed by alpha
 
     def __repr__(self):
         return f"ColorScheme(rgb=[{', '.join(self.rgb)}])"
 
-    @staticmethod
-    def _convert_rgb_to_rgba(rgb: str, a: float) -> str:
-        r, g, b = rgb[4:-1].split(', ')
-        return f"rgba({r}, {g}, {b}, {a})"
+    @classmethod
+    def _parse_rgb(cls, rgb: str) -> tuple[int, int, int]:
+        match = cls._RGB_PATTERN.fullmatch(rgb)
+        if match is None or any(int(v) > 255 for v in match.groups()):
+            raise ValueError(f"Expected a color formatted as 'rgb(r, g, b)', got {rgb!r}")
+        r, g, b = (int(v) for v in match.groups())
+        return r, g, b
 
-    def as_rgba(self, a: float) -> list[str]:
-        return [self._convert_rgb_to_rgba(c, a) for c in self.rgb]
+    def as_rgba(self, a: float) -> tuple[str, ...]:
+        if a not in self._rgba:
+            self._rgba[a] = tuple(f"rgba({r}, {g}, {b}, {a})" for r, g, b in self.values)
+        return self._rgba[a]
     
 
 class SurveyField:
@@ -29,13 +48,108 @@ class SurveyField:
         self.responses: list[str] = responses  # Categorical values with preferred ordering
         self.field_type: str = field_type  # Differentiate fields by type
         self.colors: ColorScheme = colors  # Colors to use in visualizations
+        self._color_maps: dict[float | None, Mapping[str, str]] = {}  # Keyed by alpha
+        self._series_color_maps: dict[float | None, tuple[Mapping[str, str], ...]] = {}
 
     def __repr__(self):
         return f"SurveyField(name={self.name!r}, num_responses={len(self.responses)})"
 
-    def color_map(self, a: float | None = None) -> dict[str, str]:
-        colors = self.colors.as_rgba(a) if a else self.colors.rgb
-        return dict(zip(self.responses, colors))
+    # Both color maps are cached per alpha and read-only, since every caller shares them;
+    # copy into plain dicts before handing them to a component
+    def color_map(self, a: float | None = None) -> Mapping[str, str]:
+        if a not in self._color_maps:
+            colors = self.colors.as_rgba(a) if a else self.colors.rgb
+            self._color_maps[a] = MappingProxyType(dict(zip(self.responses, colors)))
+        return self._color_maps[a]
     
-    def series_color_map(self, a: float | None = None) -> list[dict]:
-        return [{"name": k, "color": c} for k, c in self.color_map(a).items()]
+    def series_color_map(self, a: float | None = None) -> tuple[Mapping[str, str], ...]:
+        if a not in self._series_color_maps:
+            self._series_color_maps[a] = tuple(MappingProxyType({"name": k, "color": c})
+                                               for k, c in self.color_map(a).items())
+        return self._series_color_maps[a]
+
+
+class CrosstabCube:
+    """
+    Respondent counts for every attribute/variable pair, computed once up front so
+    that chart callbacks never have to group the survey data. Each pair is stored as
+    an integer array with attribute responses along axis 0 and variable responses
+    along axis 1 (in the preferred ordering of `SurveyField.responses`). When given,
+    `compute` fills in pairs on first request instead (e.g., for filtered respondents).
+    """
+    def __init__(self,
+                 counts: dict[tuple[str, str], np.ndarray],
+                 compute: Callable[[str, str], np.ndarray] | None = None):
+        self.counts: dict[tuple[str, str], np.ndarray] = counts
+        self.compute: Callable[[str, str], np.ndarray] | None = compute
+
+    def __repr__(self):
+        return f"CrosstabCube(num_pairs={len(self.counts)})"
+
+    def get(self, x: str, y: str) -> np.ndarray:
+        """Counts with `x` responses along axis 0 and `y` responses along axis 1"""
+        if (x, y) in self.counts:
+            return self.counts[(x, y)]
+        if (y, x) in self.counts or self.compute is None:
+            return self.counts[(y, x)].T
+
+        pair_counts = self.compute(x, y)
+        pair_counts.flags.writeable = False
+        self.counts[(x, y)] = pair_counts
+        return pair_counts
+
+
+class BitmapIndex:
+    """
+    One packed bitmap per survey field and response marking which respondents gave
+    that response. Filtering respondents is then a few bitwise ANDs/ORs over packed
+    bytes, and counting what is left is a popcount, with no boolean masking of frames.
+    """
+    def __init__(self, bitmaps: dict[str, np.ndarray], responses: dict[str, list[str]], num_rows: int):
+        self.bitmaps: dict[str, np.ndarray] = bitmaps  # Shape (num responses, num bytes) per field
+        self.responses: dict[str, list[str]] = responses
+        self.num_rows: int = num_rows
+
+    def __repr__(self):
+        return f"BitmapIndex(num_fields={len(self.bitmaps)}, num_rows={self.num_rows})"
+
+    @classmethod
+    def from_codes(cls, codes: dict[str, np.ndarray], fields: list[SurveyField]) -> "BitmapIndex":
+        """Respondents with a missing (-1) code are absent from every bitmap of that field"""
+        bitmaps = {}
+        for field in fields:
+            field_codes = np.asarray(codes[field.name])
+            matches = field_codes[np.newaxis, :] == np.arange(len(field.responses))[:, np.newaxis]
+            bitmaps[field.name] = np.packbits(matches, axis=1)
+
+        num_rows = len(codes[fields[0].name]) if fields else 0
+        return cls(bitmaps, {f.name: list(f.responses) for f in fields}, num_rows)
+
+    def mask(self, filters: dict[str, list[str]]) -> np.ndarray | None:
+        """
+        Packed bitmap of respondents that gave any of the listed responses for every
+        filtered field (OR within a field, AND across fields). None means no filter.
+        """
+        mask = None
+        for name, selected in filters.items():
+            if not selected:
+                continue
+            bitmaps = self.bitmaps[name]
+            field_mask = np.bitwise_or.reduce(bitmaps[[self.responses[name].index(r) for r in selected]], axis=0)
+            mask = field_mask if mask is None else mask & field_mask
+        return mask
+
+    def count(self, mask: np.ndarray | None = None) -> int:
+        if mask is None:
+            return self.num_rows
+        return int(np.bitwise_count(mask).sum())
+
+    def crosstab(self, x: str, y: str, mask: np.ndarray | None = None) -> np.ndarray:
+        """Counts with `x` responses along axis 0 and `y` responses along axis 1"""
+        x_bitmaps = self.bitmaps[x] if mask is None else self.bitmaps[x] & mask
+        y_bitmaps = self.bitmaps[y]
+
+        counts = np.empty((len(x_bitmaps), len(y_bitmaps)), dtype=np.int64)
+        for i, x_bitmap in enumerate(x_bitmaps):
+            counts[i] = np.bitwise_count(x_bitmap & y_bitmaps).sum(axis=1, dtype=np.int64)
+        return counts
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from models import SurveyField
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Compiled survey data lives next to the source CSV (e.g., `steak-risk-survey.store/`)
+# as one `.npy` array of category codes per survey field plus the respondent IDs.
+# A small manifest records which source file and registry the arrays were built
+# from, so any change to either triggers a rebuild on the next load.
+#
+# pandas is only imported to (re)build the store or to materialize a DataFrame;
+# serving the app from an up-to-date store needs nothing beyond the NumPy arrays.
+STORE_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'RespondentID'
+CHUNKSIZE = 100_000  # Rows parsed at a time when (re)building the store
+STALE_SECONDS = 3600  # Temporary files older than this were left by a compile that never finished
+
+
+class IngestStats:
+    """Throughput and peak traced memory (Python and NumPy allocations) of one ingest"""
+    def __init__(self, rows: int, seconds: float, peak_bytes: int | None, chunksize: int):
+        self.rows: int = rows
+        self.seconds: float = seconds
+        self.peak_bytes: int | None = peak_bytes  # None unless memory was traced
+        self.chunksize: int = chunksize
+
+    def __repr__(self):
+        peak_mb = 'None' if self.peak_bytes is None else f'{self.peak_bytes / 2**20:,.1f}'
+        return f"IngestStats(rows={self.rows:,}, rows_per_sec={self.rows_per_sec:,.0f}, peak_mb={peak_mb})"
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+    def to_dict(self) -> dict:
+        return {'rows': self.rows,
+                'seconds': self.seconds,
+                'rows_per_sec': self.rows_per_sec,
+                'peak_bytes': self.peak_bytes,
+                'chunksize': self.chunksize}
+
+
+class SurveyStore:
+    """
+    Memory-mapped survey data. Arrays are read-only views of the `.npy` files on disk,
+    so every worker process that opens the same store shares the same pages.
+    """
+    def __init__(self, path: Path, index: np.ndarray, codes: dict[str, np.ndarray], manifest: dict):
+        self.path: Path = path  # Directory holding the arrays for this build
+        self.index: np.ndarray = index  # Respondent IDs
+        self.codes: dict[str, np.ndarray] = codes  # Category codes per field, -1 for NaN
+        self.manifest: dict = manifest
+
+    def __repr__(self):
+        return f"SurveyStore(path={str(self.path)!r}, num_rows={len(self.index)})"
+
+    @property
+    def version(self) -> str:
+        """Identifies the source data the store was built from"""
+        return self.manifest['build']
+
+    @property
+    def ingest_stats(self) -> IngestStats:
+        """How the source CSV was ingested when this build was compiled"""
+        ingest = self.manifest['ingest']
+        return IngestStats(ingest['rows'], ingest['seconds'], ingest['peak_bytes'], ingest['chunksize'])
+
+    def to_dataframe(self, registry: dict[str, SurveyField]) -> pd.DataFrame:
+        import pandas as pd
+
+        return pd.DataFrame(
+            data={col: pd.Categorical.from_codes(self.codes[col], categories=field.responses, ordered=True)
+                  for col, field in registry.items()},
+            index=pd.Index(self.index, name=INDEX_NAME)
+        )
+
+
+def default_store_dir(filepath: str | Path) -> Path:
+    return Path(filepath).with_suffix('.store')
+
+
+def source_fingerprint(filepath: str | Path) -> dict:
+    stat = os.stat(filepath)
+    return {'name': Path(filepath).name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def build_id(filepath: str | Path) -> str:
+    """Changes whenever the source file does; store builds are named after it"""
+    source = source_fingerprint(filepath)
+    return f"{source['size']}-{source['mtime_ns']}"
+
+
+def _registry_manifest(registry: dict[str, SurveyField]) -> dict:
+    return {name: {'question': f.question, 'responses': list(f.responses)} for name, f in registry.items()}
+
+
+def _build_name(filepath: str | Path, registry: dict[str, SurveyField]) -> str:
+    """Build ID plus a digest of the format and registry, which also determine the arrays"""
+    layout = json.dumps([STORE_FORMAT, _registry_manifest(registry)], sort_keys=True)
+    return f"{build_id(filepath)}-{hashlib.sha256(layout.encode()).hexdigest()[:8]}"
+
+
+def _is_current(manifest: dict | None, filepath: str | Path, registry: dict[str, SurveyField]) -> bool:
+    return (manifest is not None
+            and manifest.get('format') == STORE_FORMAT
+            and manifest.get('source') == source_fingerprint(filepath)
+            and manifest.get('fields') == _registry_manifest(registry))
+
+
+def _read_manifest(store_dir: Path) -> dict | None:
+    try:
+        with open(store_dir / MANIFEST_NAME, 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _is_stale(path: Path) -> bool:
+    """Whether temporary `path` is old enough to have been abandoned (False if already gone)"""
+    try:
+        return time.time() - path.stat().st_mtime > STALE_SECONDS
+    except FileNotFoundError:
+        return False
+
+
+def _code_dtype(num_categories: int) -> np.dtype:
+    return np.dtype(np.int8) if num_categories < np.iinfo(np.int8).max else np.dtype(np.int16)
+
+
+def read_survey_codes(filepath: str | Path,
+                      registry: dict[str, SurveyField],
+                      chunksize: int = CHUNKSIZE,
+                      trace_memory: bool = False) -> tuple[np.ndarray, dict[str, np.ndarray], IngestStats]:
+    """
+    Reads the source CSV `chunksize` rows at a time and converts each block straight
+    to compact category codes, so memory is bounded by one block of strings rather
+    than the whole file. Responses missing from `SurveyField.responses` get code -1,
+    i.e. NaN, same as `pd.Categorical`. Returns respondent IDs, codes, and stats.
+
+    With `trace_memory`, the stats include the peak traced memory, which slows the
+    ingest down. A tracer that is already running is left as it is (not reset), so the
+    peak is then its own, since whenever it was last reset.
+    """
+    import pandas as pd
+
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    index_chunks = []
+    code_chunks = {col: [] for col in registry}
+    reader = pd.read_csv(filepath,
+                         usecols=[INDEX_NAME] + [f.question for f in registry.values()],
+                         chunksize=chunksize)
+    for chunk in reader:
+        index_chunks.append(chunk[INDEX_NAME].to_numpy())
+        for col, field in registry.items():
+            codes = pd.Categorical(chunk[field.question], categories=field.responses).codes
+            code_chunks[col].append(codes.astype(_code_dtype(len(field.responses)), copy=False))
+
+    index = np.concatenate(index_chunks)
+    codes = {col: np.concatenate(chunks) for col, chunks in code_chunks.items()}
+
+    seconds = time.perf_counter() - start
+    peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if started:
+        tracemalloc.stop()
+
+    return index, codes, IngestStats(len(index), seconds, peak_bytes, chunksize)
+
+
+def compile_survey_store(filepath: str | Path,
+                         registry: dict[str, SurveyField],
+                         store_dir: str | Path | None = None,
+                         chunksize: int = CHUNKSIZE) -> dict:
+    """
+    Ingests the source CSV (see `read_survey_codes`) and writes each field's category
+    codes to the store. Each build goes to its own subdirectory and the manifest is
+    swapped in atomically, so workers that already mapped a previous build keep
+    reading valid arrays. Returns the new manifest.
+    """
+    store_dir = Path(store_dir) if store_dir else default_store_dir(filepath)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    source = source_fingerprint(filepath)
+    build = _build_name(filepath, registry)
+
+    index, codes, stats = read_survey_codes(filepath, registry, chunksize)
+
+    build_dir = Path(tempfile.mkdtemp(prefix='.build-', dir=store_dir))
+    np.save(build_dir / f'{INDEX_NAME}.npy', index)
+    for col, field_codes in codes.items():
+        np.save(build_dir / f'{col}.npy', field_codes)
+
+    # Another worker may have finished the same build first; either copy is fine
+    try:
+        os.rename(build_dir, store_dir / build)
+    except OSError:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    manifest = {'format': STORE_FORMAT,
+                'build': build,
+                'source': source,
+                'num_rows': len(index),
+                'fields': _registry_manifest(registry),
+                'ingest': stats.to_dict()}
+
+    previous = _read_manifest(store_dir)
+    fd, tmp_manifest = tempfile.mkstemp(prefix='.manifest-', dir=store_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(tmp_manifest, store_dir / MANIFEST_NAME)
+
+    # Drop older builds, keeping the one just replaced until the next swap, since other
+    # processes may have read its manifest but not mapped its arrays yet (arrays already
+    # mapped stay readable regardless); and the leftovers of compiles that failed midway
+    keep = {build, previous.get('build') if previous else None}
+    for path in store_dir.iterdir():
+        if not path.name.startswith('.'):
+            if path.is_dir() and path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+        elif path.name.startswith(('.build-', '.manifest-')) and _is_stale(path):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+    return manifest
+
+
+def open_survey_store(filepath: str | Path,
+                      registry: dict[str, SurveyField],
+                      store_dir: str | Path | None = None,
+                      chunksize: int = CHUNKSIZE) -> SurveyStore:
+    """
+    Memory-maps the compiled survey data, (re)building it first if it is missing or
+    out of date with the source CSV or the registry.
+    """
+    store_dir = Path(store_dir) if store_dir else default_store_dir(filepath)
+
+    manifest = _read_manifest(store_dir)
+    if not _is_current(manifest, filepath, registry) or not (store_dir / manifest['build']).is_dir():
+        manifest = compile_survey_store(filepath, registry, store_dir, chunksize)
+
+    build_dir = store_dir / manifest['build']
+    index = np.load(build_dir / f'{INDEX_NAME}.npy', mmap_mode='r')
+    codes = {col: np.load(build_dir / f'{col}.npy', mmap_mode='r') for col in registry}
+
+    return SurveyStore(build_dir, index, codes, manifest)
@@ -0,0 +1,82 @@
+"""
+Checks the response cache and its shared disk backend, e.g.
+`python -m pytest Y2025W23/test_cache.py`
+"""
+import os
+
+import pytest
+
+from cache import DiskBackend, ResponseCache
+
+
+def entries(directory) -> dict[str, int]:
+    """Number of entries per version subdirectory"""
+    return {path.name: len(list(path.glob('*.pkl'))) for path in directory.iterdir() if path.is_dir()}
+
+
+def test_memory_lru():
+    cache = ResponseCache(maxsize=2)
+    calls = []
+
+    @cache.cached()
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(1), square(2), square(1), square(3), square(2)] == [1, 4, 1, 9, 4]
+    assert calls == [1, 2, 3, 2]  # 2 was the least recently used when 3 came in
+    assert cache.info() == {'hits': 1, 'misses': 4, 'backend_hits': 0, 'size': 2, 'maxsize': 2}
+
+
+def test_backend_shared_between_caches(tmp_path):
+    first, second = (ResponseCache(backend=DiskBackend(tmp_path)) for _ in range(2))
+    calls = []
+
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert first.cached()(square)(3) == 9
+    assert second.cached()(square)(3) == 9
+    assert calls == [3]
+    assert second.backend_hits == 1
+
+
+def test_backend_bounded(tmp_path):
+    backend = DiskBackend(tmp_path, maxsize=3)
+    for i in range(5):
+        backend.set(f'key-{i}', i)
+        os.utime(backend._path(f'key-{i}', ''), (i, i))  # Distinct ages, oldest first
+
+    backend.get('key-2')  # Now the most recently used
+    backend.set('key-5', 5)
+
+    assert sum(entries(tmp_path).values()) == 3
+    for key in ['key-0', 'key-1', 'key-3']:
+        with pytest.raises(KeyError):
+            backend.get(key)
+    assert [backend.get(key) for key in ['key-2', 'key-4', 'key-5']] == [2, 4, 5]
+
+
+def test_version_change_prunes_backend(tmp_path):
+    version = ['a']
+    invalidated = []
+    cache = ResponseCache(backend=DiskBackend(tmp_path), version=lambda: version[0],
+                          on_invalidate=lambda: invalidated.append(version[0]))
+    (tmp_path / 'legacy.pkl').write_bytes(b'')  # Left by an older layout
+
+    square = cache.cached()(lambda x: x * x)
+    assert [square(x) for x in range(4)] == [0, 1, 4, 9]
+    assert list(entries(tmp_path).values()) == [4]
+    assert not (tmp_path / 'legacy.pkl').exists()
+
+    version[0] = 'b'
+    assert square(2) == 4
+    assert invalidated == ['b']
+    assert list(entries(tmp_path).values()) == [1]
+
+    # A cache starting on a new version also drops what earlier runs left behind
+    version[0] = 'c'
+    restarted = ResponseCache(backend=DiskBackend(tmp_path), version=lambda: version[0])
+    assert restarted.cached()(lambda x: x * x)(5) == 25
+    assert list(entries(tmp_path).values()) == [1]
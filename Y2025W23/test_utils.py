@@ -0,0 +1,90 @@
+"""
+Checks the crosstab cube, built from the compiled survey store, against the pandas
+groupby/pivot that `prepare_bar_data` used to run on every callback over the CSV,
+e.g. `python -m pytest Y2025W23/test_utils.py`
+"""
+import itertools
+import math
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from utils import FIELD_TYPES, SURVEY_REGISTRY, build_crosstab_cube, load_survey_store, prepare_bar_data
+
+
+SURVEY_CSV = str(Path(__file__).resolve().parent / 'steak-risk-survey.csv')
+
+PAIRS = [(attribute, variable, transpose)
+         for (attribute, variable), transpose in itertools.product(
+             itertools.product(FIELD_TYPES['attribute'], FIELD_TYPES['variable']), [False, True])]
+
+
+def reference_survey(filepath: str) -> pd.DataFrame:
+    """`load_transform_data` as it was before the store: the whole CSV, renamed and categorical"""
+    dataframe = pd.read_csv(filepath).set_index('RespondentID')
+    dataframe.rename(columns={f.question: name for name, f in SURVEY_REGISTRY.items()},
+                     inplace=True)
+
+    for col, field in SURVEY_REGISTRY.items():
+        dataframe[col] = pd.Categorical(dataframe[col], categories=field.responses, ordered=True)
+
+    return dataframe
+
+
+def reference_bar_data(dataframe: pd.DataFrame, attribute: str, variable: str, transpose: bool = False) -> tuple[list, list]:
+    """`prepare_bar_data` as it was before the cube: groupby, pivot, `All` row and cumsum"""
+    x = variable if transpose else attribute
+    y = attribute if transpose else variable
+
+    group = [x, y]
+
+    dff = dataframe[group].copy()
+    dff['value'] = 1
+    dff = dff.groupby(group, observed=True).sum().reset_index()
+    dff = dff.pivot(index=y, columns=x, values='value')
+
+    dff = pd.concat([dff,
+                     pd.DataFrame(index=['All'], data=[{col: dff[col].sum() for col in dff}])])
+
+    data = dff.reset_index().to_dict('records')
+
+    dff_ref = dff.loc['All'].to_frame()
+    dff_ref['csum'] = dff_ref['All'].cumsum()
+    dff_ref['perc'] = dff_ref['csum'] / dff_ref['All'].sum()
+
+    ref = dff_ref['perc'].iloc[:-1].values.tolist()
+    return data, ref
+
+
+def assert_same_values(actual: list, expected: list) -> None:
+    """Same values in the same order, of the same types, with NaN where expected has NaN"""
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert type(a) is type(e), (a, e)
+        if isinstance(e, float) and math.isnan(e):
+            assert math.isnan(a)
+        else:
+            assert a == e
+
+
+@pytest.fixture(scope='module')
+def survey() -> pd.DataFrame:
+    return reference_survey(SURVEY_CSV)
+
+
+@pytest.fixture(scope='module')
+def cube():
+    return build_crosstab_cube(load_survey_store(SURVEY_CSV).codes)
+
+
+@pytest.mark.parametrize('attribute, variable, transpose', PAIRS)
+def test_cube_matches_groupby(survey, cube, attribute, variable, transpose):
+    data, ref = prepare_bar_data(cube, attribute, variable, transpose)
+    expected_data, expected_ref = reference_bar_data(survey, attribute, variable, transpose)
+
+    assert len(data) == len(expected_data)
+    for record, expected_record in zip(data, expected_data):
+        assert list(record) == list(expected_record)
+        assert_same_values(list(record.values()), list(expected_record.values()))
+    assert_same_values(ref, expected_ref)
@@ -1,16 +1,26 @@
-import pandas as pd
+from __future__ import annotations
 
-from models import ColorScheme, SurveyField
+import functools
+import threading
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+import numpy as np
+
+from models import BitmapIndex, ColorScheme, CrosstabCube, SurveyField
+from store import CHUNKSIZE, SurveyStore, open_survey_store
+
+if TYPE_CHECKING:
+    import pandas as pd  # Only needed to parse the CSV or build frames, see `store.py`
 
 
 # Define colors and survey field information here to make `app.py` less cluttered
 BINARY_COLOR = ColorScheme(['rgb(229, 56, 59)', 'rgb(245, 243, 244)'])
 STEAK_COLOR = ColorScheme(['rgb(164, 22, 26)', 'rgb(229, 56, 59)', 'rgb(192, 165, 164)', 'rgb(211, 211, 211)', 'rgb(245, 243, 244)'])
 GENDER_COLOR = ColorScheme(['rgb(114, 1, 168)', 'rgb(31, 158, 137)'])
-AGE_COLOR = ColorScheme(['rbg(217, 237, 146)', 'rbg(153, 217, 140)', 'rbg(82, 182, 154)', 'rbg(22, 138, 173)'])
+AGE_COLOR = ColorScheme(['rgb(217, 237, 146)', 'rgb(153, 217, 140)', 'rgb(82, 182, 154)', 'rgb(22, 138, 173)'])
 INCOME_COLOR = ColorScheme(['rgb(255, 192, 62)', 'rgb(233, 174, 42)', 'rgb(189, 147, 43)', 'rgb(136, 114, 53)', 'rgb(92, 83, 55)'][::-1])
 EDUCATION_COLOR = ColorScheme(['rgb(90, 13, 109)', 'rgb(131, 44, 115)', 'rgb(172, 73, 121)', 'rgb(213, 103, 127)', 'rgb(255, 134, 134)'][::-1])
-LOCATION_COLOR = ColorScheme(['rbg(96, 73, 90)', 'rbg(167, 90, 90)', 'rbg(125, 186, 96)', 'rbg(194, 209, 27)', 'rbg(246, 153, 45)', 'rbg(255, 200, 0)', 'rbg(12, 99, 127)', 'rbg(76, 118, 128)', 'rbg(56, 163, 165)'])
+LOCATION_COLOR = ColorScheme(['rgb(96, 73, 90)', 'rgb(167, 90, 90)', 'rgb(125, 186, 96)', 'rgb(194, 209, 27)', 'rgb(246, 153, 45)', 'rgb(255, 200, 0)', 'rgb(12, 99, 127)', 'rgb(76, 118, 128)', 'rgb(56, 163, 165)'])
 
 SURVEY_FIELDS =[
     SurveyField(name='Lottery',
@@ -122,26 +132,123 @@ FIELD_TYPES = {'attribute': [f.name for f in SURVEY_FIELDS if f.field_type=='att
                'variable': [f.name for f in SURVEY_FIELDS if f.field_type=='variable']}
 
 
-def load_transform_data(filepath: str = 'Y2025W23/steak-risk-survey.csv',
-                        registry: dict[str, SurveyField] = SURVEY_REGISTRY) -> pd.DataFrame:
+SURVEY_FILEPATH = 'Y2025W23/steak-risk-survey.csv'
+
+T = TypeVar('T')
+
+
+def load_once(loader: Callable[[], T]) -> Callable[[], T]:
+    """
+    Defers a zero-argument loader until its first call and caches the result. Threads
+    that call it while the first load is still running wait for that result instead
+    of loading again. Call `.reset()` on the wrapper to load again on the next call.
+    """
+    lock = threading.Lock()
+    result = []
+
+    @functools.wraps(loader)
+    def wrapper() -> T:
+        if not result:
+            with lock:
+                if not result:
+                    result.append(loader())
+        return result[0]
+
+    def reset() -> None:
+        with lock:
+            result.clear()
+
+    wrapper.reset = reset
+    return wrapper
+
+
+def load_survey_store(filepath: str = SURVEY_FILEPATH,
+                      registry: dict[str, SurveyField] = SURVEY_REGISTRY,
+                      chunksize: int = CHUNKSIZE) -> SurveyStore:
+    """
+    Memory-maps the category codes of each survey field from the compiled store next
+    to the source CSV, which is rebuilt automatically (reading `chunksize` rows at a
+    time) whenever the CSV changes.
+    """
+    return open_survey_store(filepath, registry, chunksize=chunksize)
+
+
+def load_transform_data(filepath: str = SURVEY_FILEPATH,
+                        registry: dict[str, SurveyField] = SURVEY_REGISTRY,
+                        chunksize: int = CHUNKSIZE) -> pd.DataFrame:
     """
     Loads source data, renames columns, and converts to categorical data types.
     See https://pandas.pydata.org/docs/user_guide/categorical.html for more information.
+    The CSV itself is only parsed (in chunks) when the compiled survey store is out of date.
     """
-    dataframe = pd.read_csv(filepath).set_index('RespondentID')
-    dataframe.rename(columns={f.question: name for name, f in registry.items()},
-                     inplace=True)
+    return load_survey_store(filepath, registry, chunksize).to_dataframe(registry)
 
-    for col, field in registry.items():
-        dataframe[col] = pd.Categorical(dataframe[col], categories=field.responses, ordered=True)
 
-    return dataframe
+def categorical_codes(dataframe: pd.DataFrame,
+                      registry: dict[str, SurveyField] = SURVEY_REGISTRY) -> dict[str, np.ndarray]:
+    """
+    Integer category codes for each survey field, where -1 marks a missing or
+    unrecognized response (i.e., NaN in the categorical column).
+    """
+    return {col: dataframe[col].cat.codes.to_numpy() for col in registry}
 
 
-def prepare_bar_data(dataframe: pd.DataFrame,
+def count_pairs(x_codes: np.ndarray, y_codes: np.ndarray, num_x: int, num_y: int) -> np.ndarray:
+    """
+    Counts co-occurring category codes in a single `np.bincount` pass. Rows where
+    either code is -1 are dropped, same as `groupby(observed=True)` drops NaN keys.
+    Returns counts with `x` codes along axis 0 and `y` codes along axis 1.
+    """
+    x_codes = x_codes.astype(np.intp)
+    pair_codes = x_codes * num_y + y_codes
+
+    # Route NaN rows into one overflow bin rather than compacting the arrays
+    size = num_x * num_y
+    pair_codes[(x_codes < 0) | (y_codes < 0)] = size
+
+    return np.bincount(pair_codes, minlength=size + 1)[:size].reshape(num_x, num_y)
+
+
+def build_crosstab_cube(codes: dict[str, np.ndarray],
+                        registry: dict[str, SurveyField] = SURVEY_REGISTRY,
+                        field_types: dict[str, list[str]] = FIELD_TYPES) -> CrosstabCube:
+    """
+    Counts respondents for every attribute/variable pair once, so `prepare_bar_data`
+    only has to slice and format precomputed integer arrays. `codes` are the category
+    codes of each field (see `categorical_codes`).
+    """
+    counts = {}
+    for attribute in field_types['attribute']:
+        for variable in field_types['variable']:
+            pair_counts = count_pairs(codes[attribute], codes[variable],
+                                      len(registry[attribute].responses),
+                                      len(registry[variable].responses))
+            pair_counts.flags.writeable = False  # shared by every callback
+            counts[(attribute, variable)] = pair_counts
+
+    return CrosstabCube(counts)
+
+
+def build_bitmap_index(codes: dict[str, np.ndarray],
+                       registry: dict[str, SurveyField] = SURVEY_REGISTRY) -> BitmapIndex:
+    """Per-response bitmaps of each survey field, used to filter respondents"""
+    return BitmapIndex.from_codes(codes, list(registry.values()))
+
+
+def filter_crosstab_cube(bitmaps: BitmapIndex, filters: dict[str, list[str]]) -> CrosstabCube:
+    """
+    Crosstab cube limited to respondents matching `filters`, a mapping of field names
+    to accepted responses (see `BitmapIndex.mask`). Pairs are counted on first use.
+    """
+    mask = bitmaps.mask(filters)
+    return CrosstabCube({}, compute=functools.partial(bitmaps.crosstab, mask=mask))
+
+
+def prepare_bar_data(cube: CrosstabCube,
                      attribute: str,
                      variable: str,
-                     transpose: bool = False) -> tuple[list, list]:
+                     transpose: bool = False,
+                     registry: dict[str, SurveyField] = SURVEY_REGISTRY) -> tuple[list, list]:
     """
     Generates input for `data` prop in `dmc.BarChart` as-is. Also calculates
     percent x-values that can be used to generate input for `referenceLines`.
@@ -149,23 +256,26 @@ def prepare_bar_data(dataframe: pd.DataFrame,
     x = variable if transpose else attribute
     y = attribute if transpose else variable
 
-    group = [x, y]
+    # Rows are `y` responses, columns are `x` responses
+    counts = cube.get(y, x)
 
-    dff = dataframe[group].copy()
-    dff['value'] = 1
-    dff = dff.groupby(group, observed=True).sum().reset_index()
-    dff = dff.pivot(index=y, columns=x, values='value')
+    # Only responses observed alongside the other field become rows/columns, and any
+    # unobserved combination between them is NaN (same as `groupby(observed=True)`
+    # followed by `pivot`, which also promotes every count to float)
+    rows = counts.any(axis=1).nonzero()[0]
+    cols = counts.any(axis=0).nonzero()[0]
+    table = counts[np.ix_(rows, cols)]
+    if (table == 0).any():
+        table = np.where(table == 0, np.nan, table)
 
-    # Add totals for all respondents
-    dff = pd.concat([dff,
-                     pd.DataFrame(index=['All'], data=[{col: dff[col].sum() for col in dff}])])
+    # Add totals for all respondents; these also drive the reference lines below
+    totals = np.nansum(table, axis=0)
 
-    data = dff.reset_index().to_dict('records')
+    index = [registry[y].responses[i] for i in rows] + ['All']
+    columns = [registry[x].responses[i] for i in cols]
+    data = [{'index': label, **dict(zip(columns, values))}
+            for label, values in zip(index, np.vstack([table, totals]).tolist())]
 
     # Determine x-values as percent for reference lines
-    dff_ref = dff.loc['All'].to_frame()
-    dff_ref['csum'] = dff_ref['All'].cumsum()
-    dff_ref['perc'] = dff_ref['csum'] / dff_ref['All'].sum()
-
-    ref = dff_ref['perc'].iloc[:-1].values.tolist()
+    ref = (np.cumsum(totals) / totals.sum())[:-1].tolist()
     return data, ref
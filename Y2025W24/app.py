@@ -1,19 +1,38 @@
+import functools
+import hashlib
+import os
+
 import dash_mantine_components as dmc
-from dash import Dash, dcc, callback, Output, Input, State, ctx, ALL
+import flask
+from dash import Dash, dcc, callback, ClientsideFunction, Output, Input, State, ctx, ALL
 from dash.exceptions import PreventUpdate
+from plotly.io.json import to_json_plotly
 
-from utils import VIOLATION_REGISTRY, set_custom_template_as_default
+from models import HEARING_COLORS
+from prerender import PrerenderedCallback
+from utils import VIOLATION_REGISTRY, format_number_si, set_custom_template_as_default
 
-from layout.config import FONT_BODY, BACKGROUND_COLOR
+from layout.config import FONT_BODY, FONT_TITLE, BACKGROUND_COLOR
 from layout.header import app_header
 from layout.selector import item_selector
 from layout.summary import summary_section_children
-from layout.visualizations import plotly_heat_map, visualization_group, legend_stack_children
+from layout.visualizations import heat_map_patch, heat_map_z, heat_map_zmax, visualization_group, legend_stack_children
 
 
 set_custom_template_as_default()
 
 
+# CONSTANTS
+# -----------------------------------------------------------------------------
+# `update_data` responses are served pre-serialized, rendered on first request ('lazy'),
+# all at once when the app starts ('startup'), or not at all ('off')
+PRERENDER = os.getenv('Y25W24_PRERENDER', 'lazy')
+
+# 'server' answers each click with a request; 'clientside' fetches every code's outputs
+# once (see `violation_payload`) and navigates in the browser, see `assets/clientside.js`
+CALLBACK_MODE = os.getenv('Y25W24_CALLBACK_MODE', 'server')
+
+
 # DATA
 # -----------------------------------------------------------------------------
 index = 0
@@ -86,12 +105,24 @@ app.layout = dmc.MantineProvider(
 
 # CALLBACKS
 # -----------------------------------------------------------------------------
-@callback(
+select_code_args = [
     Output('store-selected', 'data'),
     Input({'type': 'select-code-button', 'index': ALL}, 'n_clicks'),
     Input({'type': 'increment-code-button', 'index': ALL}, 'n_clicks'),
     State('store-selected', 'data')
-)
+]
+
+update_data_outputs = [
+    Output('selector-center-text', 'children'),
+    Output('summary-section', 'children'),
+    Output('figure-heatmap', 'figure'),
+    Output('figure-waterfall', 'data'),
+    Output('figure-donut', 'data'),
+    Output('legend-donut', 'children'),
+    Output('group-visualizations', 'style'),
+]
+
+
 def select_code(_, __, store_data):
     triggered_id = ctx.triggered_id
     if triggered_id is None:
@@ -115,31 +146,113 @@ def select_code(_, __, store_data):
     return new_store_data
 
 
-@callback(
-    Output('code-selector', 'children'),
-    Output('summary-section', 'children'),
-    Output('figure-heatmap', 'figure'),
-    Output('figure-waterfall', 'data'),
-    Output('figure-donut', 'data'),
-    Output('legend-donut', 'children'),
-    Output('group-visualizations', 'style'),
-    Input('store-selected', 'data'),
-)
 def update_data(store_data):
     v = VIOLATION_REGISTRY[store_data['index']]
 
     visibility = {"display": "none"} if v.total_count==0 else {"display": "flex"}
     
-    return (item_selector(v.label, color='yellow'),
+    return (v.label,
             summary_section_children(v, color='yellow'),
-            plotly_heat_map(v),
+            heat_map_patch(v),
             v.get_waterfall_data(),
             v.get_hearing_data(),
             legend_stack_children(v),
             visibility
             )
 
-    
+
+if CALLBACK_MODE == 'clientside':
+    app.clientside_callback(
+        ClientsideFunction(namespace='y25w24', function_name='selectCode'),
+        *select_code_args
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='y25w24', function_name='updateData'),
+        *update_data_outputs,
+        Input('store-selected', 'data'),
+        State('figure-heatmap', 'figure')
+    )
+
+else:
+    callback(*select_code_args)(select_code)
+    callback(*update_data_outputs, Input('store-selected', 'data'))(update_data)
+
+
+# CLIENTSIDE PAYLOAD
+# -----------------------------------------------------------------------------
+def violation_payload() -> dict:
+    """
+    What `updateData` in `assets/clientside.js` needs to rebuild the outputs of
+    `update_data` for every code: per-code values, plus the parts shared by all codes
+    """
+    waterfall_items = [{k: d[k] for k in d if k != 'total'} for d in VIOLATION_REGISTRY[0].get_waterfall_data()]
+    codes = []
+    for v in VIOLATION_REGISTRY:
+        hearing = [d['value'] for d in v.get_hearing_data()]
+        codes.append({
+            'label': v.label,
+            'definition': v.definition,
+            'fines': v.get_fines_as_list(),
+            'totals': v.get_totals_as_list(),
+            'total_count': v.total_count,
+            'waterfall': [d['total'] for d in v.get_waterfall_data()],
+            'hearing': hearing,
+            'hearing_si': [format_number_si(value) for value in hearing],
+            'z': heat_map_z(v),
+            'zmax': heat_map_zmax(v.hour_dow_counts),
+        })
+
+    return {'theme': {'color': 'yellow', 'font_title': FONT_TITLE},
+            'waterfall_items': waterfall_items,
+            'hearing_groups': [{'name': name, 'color': color} for name, color in HEARING_COLORS.items()],
+            'codes': codes}
+
+
+@functools.cache
+def violation_payload_body() -> tuple[bytes, str]:
+    """Serialized payload and its ETag; the data cannot change while the app runs"""
+    body = to_json_plotly(violation_payload()).encode()
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def serve_violation_payload() -> flask.Response:
+    """Browsers revalidate on each page load and get a 304 while the ETag matches"""
+    body, etag = violation_payload_body()
+    response = flask.Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(flask.request)
+
+
+if CALLBACK_MODE == 'clientside':
+    app.server.add_url_rule(f'{app.config.routes_pathname_prefix}_y25w24/violations.json',
+                            view_func=serve_violation_payload)
+
+
+# PRERENDERED RESPONSES
+# -----------------------------------------------------------------------------
+def selected_index(inputs: list) -> int | None:
+    """Index in an `update_data` request, or None to let Dash handle an unexpected one"""
+    value = inputs[0].get('value') if inputs else None
+    index = value.get('index') if isinstance(value, dict) else None
+    if isinstance(index, int) and 0 <= index < len(VIOLATION_REGISTRY):
+        return index
+    return None
+
+
+prerendered_update_data = PrerenderedCallback(
+    outputs=update_data_outputs,
+    func=lambda index: update_data({'index': index}),
+    key=selected_index,
+)
+
+if CALLBACK_MODE == 'server' and PRERENDER != 'off':
+    prerendered_update_data.install(app)
+if CALLBACK_MODE == 'server' and PRERENDER == 'startup':
+    prerendered_update_data.warm(range(len(VIOLATION_REGISTRY)))
+
+
 # SERVER
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+// Clientside navigation for Y25W24_CALLBACK_MODE=clientside, see `app.py`. Every code's
+// outputs come from one payload fetched from the server (and revalidated via its ETag)
+// on first use; the component builders below mirror `layout/summary.py` and
+// `layout/visualizations.py`.
+var clientside = window.dash_clientside = window.dash_clientside || {};
+
+var violationPayload = null;
+
+function loadViolationPayload() {
+  if (!violationPayload) {
+    var config = JSON.parse(document.getElementById('_dash-config').textContent);
+    violationPayload = fetch(config.requests_pathname_prefix + '_y25w24/violations.json')
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error('Failed to load violation data: ' + response.status);
+        }
+        return response.json();
+      })
+      .catch(function (err) {
+        violationPayload = null;  // Try again on the next click
+        throw err;
+      });
+  }
+  return violationPayload;
+}
+
+function dmcComponent(type, props) {
+  return {props: props, type: type, namespace: 'dash_mantine_components'};
+}
+
+function numericWithLabel(value, label, size, theme) {
+  var small = size === 'sm';
+  return dmcComponent('Group', {
+    children: [
+      dmcComponent('Text', {
+        children: value, c: theme.color, ff: theme.font_title, size: small ? '1.4rem' : '2.0rem', span: true
+      }),
+      dmcComponent('Text', {
+        children: ' ' + label, mb: small ? 2 : 4, size: small ? '1.1rem' : '1.2rem', span: true, w: small ? null : 100
+      })
+    ],
+    align: 'end',
+    gap: 'xs'
+  });
+}
+
+function summarySectionChildren(code, theme) {
+  var leftSection = dmcComponent('ScrollArea', {
+    children: [
+      dmcComponent('Text', {children: code.definition, lh: '1.6rem', mb: 20, size: '1.1rem'}),
+      dmcComponent('Group', {
+        children: code.fines.map(function (f) { return numericWithLabel(f[1], f[0], 'sm', theme); }),
+        gap: 'lg'
+      })
+    ],
+    h: 122, m: 0, p: 0, scrollbarSize: 16, type: 'auto', w: 670
+  });
+  var rightSection = dmcComponent('Stack', {
+    children: code.totals.map(function (t) { return numericWithLabel(t[1], t[0], 'lg', theme); }),
+    align: 'end', gap: 6, justify: 'end', mt: 0
+  });
+  return [leftSection, rightSection];
+}
+
+function legendItem(color, label, value) {
+  return dmcComponent('Group', {
+    children: [
+      dmcComponent('Text', {
+        children: {
+          props: {color: color, icon: 'material-symbols:circle', width: 14},
+          type: 'DashIconify',
+          namespace: 'dash_iconify'
+        },
+        ml: -6,
+        mt: 5
+      }),
+      dmcComponent('Text', {children: value, size: '0.7rem', ta: 'right', w: 34}),
+      dmcComponent('Text', {children: label, c: '#828282', size: '0.7rem', ta: 'left', w: 100})
+    ],
+    align: 'center', gap: 'xs', justify: 'end', mb: 0
+  });
+}
+
+clientside.y25w24 = {
+  // Same index arithmetic as `select_code`
+  selectCode: function (_, __, storeData) {
+    var triggered = dash_clientside.callback_context.triggered_id;
+    if (!triggered) {
+      throw dash_clientside.PreventUpdate;
+    }
+
+    return loadViolationPayload().then(function (payload) {
+      var count = payload.codes.length;
+      var index = storeData.index;
+
+      if (triggered.type === 'increment-code-button') {
+        index = triggered.index === '-' ? index - 1 : index + 1;
+        index = index < 0 ? count - 1 : (index >= count ? 0 : index);
+      } else {
+        index = Number(triggered.index);
+      }
+      return {index: index};
+    });
+  },
+
+  // Same outputs as `update_data`; the heatmap keeps its layout and trace, only `z` changes
+  updateData: function (storeData, figure) {
+    return loadViolationPayload().then(function (payload) {
+      var code = payload.codes[storeData.index];
+      var theme = payload.theme;
+
+      var heatmap = Object.assign({}, figure, {
+        data: [Object.assign({}, figure.data[0], {z: code.z, zmax: code.zmax})]
+      });
+      var waterfall = payload.waterfall_items.map(function (item, k) {
+        var bar = {item: item.item, total: code.waterfall[k], color: item.color};
+        if (item.standalone) {
+          bar.standalone = true;
+        }
+        return bar;
+      });
+      var hearing = payload.hearing_groups.map(function (group, k) {
+        return {name: group.name, value: code.hearing[k], color: group.color};
+      });
+      var legend = payload.hearing_groups.map(function (group, k) {
+        return legendItem(group.color, group.name, code.hearing_si[k]);
+      });
+
+      return [
+        code.label,
+        summarySectionChildren(code, theme),
+        heatmap,
+        waterfall,
+        hearing,
+        legend,
+        {display: code.total_count === 0 ? 'none' : 'flex'}
+      ];
+    });
+  }
+};
@@ -0,0 +1,322 @@
+"""
+Standalone benchmarks for the Y25W24 app and its data pipeline, e.g. `python Y2025W24/bench.py --repeat 10`.
+Each sample runs in a fresh interpreter from the app directory, so the data paths
+resolve and nothing is already imported or loaded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+APP_DIR = Path(__file__).resolve().parent
+
+# `models` imports NumPy for both paths, so it is imported before timing starts
+LOAD_SNIPPETS = {
+    # Parse the JSON and build one dataclass per code (how the registry used to load)
+    'json': """
+import json, time
+from models import ViolationRecord
+
+t0 = time.perf_counter()
+with open('data/nyc_parking_violation_data.json', 'r', encoding='utf-8') as fp:
+    registry = [ViolationRecord.from_dict(v) for v in json.load(fp)]
+print(time.perf_counter() - t0)
+""",
+    # Memory-map an up-to-date snapshot and create one view per code
+    'snapshot': """
+import time
+from models import ViolationTable
+from snapshot import open_violation_snapshot
+
+t0 = time.perf_counter()
+table = ViolationTable.from_snapshot(open_violation_snapshot('data/nyc_parking_violation_data.json'))
+registry = list(table)
+print(time.perf_counter() - t0)
+""",
+    # (Re)compile the snapshot from the JSON, as after the JSON changes
+    'snapshot_compile': """
+import tempfile, time
+from snapshot import compile_violation_snapshot
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    t0 = time.perf_counter()
+    compile_violation_snapshot('data/nyc_parking_violation_data.json', tmp_dir)
+    print(time.perf_counter() - t0)
+""",
+    # Everything `app.py` waits on before the registry is ready
+    'import_utils': """
+import time
+
+t0 = time.perf_counter()
+import utils
+print(time.perf_counter() - t0)
+""",
+}
+
+
+# Posts `update_data` requests for every code through Flask's test client, twice
+CLICK_SNIPPET = """
+import json, time
+import app
+
+client = app.app.server.test_client()
+outputs = [{'id': o.component_id, 'property': o.component_property} for o in app.update_data_outputs]
+
+def click(index):
+    start = time.perf_counter()
+    response = client.post('/_dash-update-component', json={
+        'output': app.prerendered_update_data.output_id,
+        'outputs': outputs,
+        'inputs': [{'id': 'store-selected', 'property': 'data', 'value': {'index': index}}],
+        'changedPropIds': ['store-selected.data'],
+        'state': [],
+    })
+    assert response.status_code == 200
+    return time.perf_counter() - start, len(response.data)
+
+first = [click(i) for i in range(len(app.VIOLATION_REGISTRY))]
+second = [click(i) for i in range(len(app.VIOLATION_REGISTRY))]
+
+print(json.dumps({'first': [t for t, _ in first],
+                  'second': [t for t, _ in second],
+                  'response_bytes': sum(n for _, n in first),
+                  'prerendered': app.prerendered_update_data.info()}))
+"""
+
+# Times `prepare_records` against the string parsing it replaced, on the same synthetic
+# records, and checks both keep the same records with the same hour and day of week
+PARSE_SNIPPET = """
+import json, time
+from bench import legacy_prepare_records, synthetic_records
+from pipeline.records import prepare_records
+
+raw = synthetic_records({rows})
+times, results = {{'legacy': [], 'vectorized': []}}, {{}}
+for _ in range({repeat}):
+    for name, prepare in [('legacy', legacy_prepare_records), ('vectorized', prepare_records)]:
+        dff = raw.copy()
+        t0 = time.perf_counter()
+        prepared = prepare(dff)
+        times[name].append(time.perf_counter() - t0)
+        results[name] = prepared
+
+legacy, vectorized = results['legacy'], results['vectorized']
+assert legacy.index.equals(vectorized.index)
+for col in ['hour', 'day_of_week']:
+    assert legacy[col].equals(vectorized[col]), col
+assert (legacy['issue_date'].to_numpy() == vectorized['issue_date'].to_numpy()).all()
+print(json.dumps({{**times, 'rows': len(raw), 'kept': len(vectorized)}}))
+"""
+
+# Writes a month of synthetic records as daily partitions, the way they are fetched
+AGGREGATE_SETUP_SNIPPET = """
+import pyarrow as pa, pyarrow.parquet as pq
+from bench import synthetic_records
+from pipeline.records import partition_filename
+from pipeline.writer import to_record_table
+
+records = synthetic_records({rows})
+bounds = [len(records) * day // 30 for day in range(31)]
+for day in range(30):
+    table = pa.Table.from_pandas(records.iloc[bounds[day]:bounds[day + 1]], preserve_index=False)
+    pq.write_table(to_record_table(table), f"{data_dir}/{{partition_filename(f'2023-03-{{day + 1:02}}')}}")
+"""
+
+# Aggregates those partitions, either after reading the whole month into one frame (no
+# `memory_limit`) or in batches within `memory_limit`, and writes the registry's JSON
+AGGREGATE_SNIPPET = """
+import json, time
+from pathlib import Path
+import pandas as pd
+from pipeline.aggregate import ViolationAggregator, aggregate_records, all_violations_record, write_violation_data
+from pipeline.memory import peak_rss
+from pipeline.records import prepare_records, read_partition
+
+with open('data/nyc_parking_violation_codes.json', 'r', encoding='utf-8') as fp:
+    aggregator = ViolationAggregator(json.load(fp))
+filepaths = sorted(Path('{data_dir}').glob('*.parquet'))
+
+t0 = time.perf_counter()
+if {memory_limit} is None:
+    dff = prepare_records(pd.concat([read_partition(fp) for fp in filepaths]))
+    aggregator.merge([fp.name for fp in filepaths], aggregate_records(dff, aggregator.code_index))
+else:
+    aggregator.ingest_files(filepaths, workers=1, memory_limit={memory_limit})
+seconds = time.perf_counter() - t0
+
+violations = aggregator.to_records()
+write_violation_data([all_violations_record(violations)] + violations, '{output}')
+print(json.dumps({{'seconds': seconds, 'peak_rss': peak_rss()}}))
+"""
+
+
+def synthetic_records(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    `rows` records of 2023 as the API returns them (all strings), with issue dates in
+    either format and about 1% unparseable or blank dates and times
+    """
+    rng = np.random.default_rng(seed)
+    with open(APP_DIR / 'data' / 'nyc_parking_violation_codes.json', 'r', encoding='utf-8') as fp:
+        descriptions = np.array([v['description'] for v in json.load(fp)], dtype=object)
+
+    days = pd.date_range('2023-01-01', '2023-12-31', freq='D')
+    date_strings = np.concatenate([days.strftime('%m/%d/%Y'), days.strftime('%Y-%m-%dT%H:%M:%S.000'),
+                                   np.array(['garbage', None], dtype=object)]).astype(object)
+    time_strings = np.array([f'{h:02}:{m:02}{p}' for p in 'AP' for h in range(1, 13) for m in range(60)]
+                            + ['00:15A', '13:10P', '12:61P', '0915A', None], dtype=object)
+
+    def pick(strings: np.ndarray, bad: int) -> np.ndarray:
+        """`strings`, mostly drawn from all but the last `bad`"""
+        index = rng.integers(0, len(strings) - bad, rows)
+        invalid = rng.random(rows) < 0.01
+        index[invalid] = rng.integers(len(strings) - bad, len(strings), invalid.sum())
+        return strings[index]
+
+    fines = rng.choice([35, 45, 50, 65, 95, 115, 250], rows)
+    return pd.DataFrame({'summons_number': np.arange(rows).astype(str).astype(object),
+                         'issue_date': pick(date_strings, 2),
+                         'violation_time': pick(time_strings, 5),
+                         'violation': descriptions[rng.integers(0, len(descriptions), rows)],
+                         'fine_amount': fines.astype(str).astype(object),
+                         'penalty_amount': np.where(rng.random(rows) < 0.3, '10', '0').astype(object),
+                         'interest_amount': np.full(rows, '0', dtype=object),
+                         'reduction_amount': np.full(rows, '0', dtype=object),
+                         'payment_amount': fines.astype(str).astype(object),
+                         'amount_due': np.full(rows, '0', dtype=object),
+                         'violation_status': rng.choice(['HEARING HELD-GUILTY', 'HEARING HELD-NOT GUILTY', None], rows),
+                         'license_type': rng.choice(['PAS', 'COM', 'OMT'], rows),
+                         'state': rng.choice(['NY', 'NJ', 'PA', 'CT'], rows),
+                         'issuing_agency': rng.choice(['TRAFFIC', 'DEPARTMENT OF TRANSPORTATION'], rows)})
+
+
+def legacy_prepare_records(dff: pd.DataFrame) -> pd.DataFrame:
+    """How records were prepared before `pipeline.parse` (from the notebook's transform)"""
+    from models import HOUR_DOW_COLUMNS, HOUR_DOW_ROWS
+    from pipeline.records import AMOUNT_COLUMNS
+
+    days_map = dict(zip([6, 0, 1, 2, 3, 4, 5], HOUR_DOW_COLUMNS))
+
+    dff['issue_date'] = pd.to_datetime(dff['issue_date'], format='mixed', errors='coerce')
+    dff['violation_time'] = pd.to_datetime(dff['violation_time']+'M', format='%I:%M%p', errors='coerce')
+    for col in AMOUNT_COLUMNS:
+        dff[col] = dff[col].astype(float)
+
+    dff.dropna(subset=['issue_date', 'violation_time', 'violation', 'fine_amount'], inplace=True)
+
+    dff['hour'] = dff['violation_time'].dt.strftime('%I %p').str.replace(r'^0', '', regex=True)
+    dff['hour'] = pd.Categorical(dff['hour'], categories=HOUR_DOW_ROWS, ordered=True)
+
+    dff['day_of_week'] = dff['issue_date'].dt.day_of_week.map(days_map)
+    dff['day_of_week'] = pd.Categorical(dff['day_of_week'], categories=HOUR_DOW_COLUMNS, ordered=True)
+
+    dff['violation_time'] = dff['violation_time'].dt.time
+    return dff
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    return {'min': min(samples),
+            'median': statistics.median(samples),
+            'max': max(samples),
+            'repeat': len(samples)}
+
+
+def run_snippet(snippet: str) -> float:
+    result = subprocess.run([sys.executable, '-c', snippet], cwd=APP_DIR,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+
+def bench_cold_start(repeat: int = 5) -> dict[str, dict]:
+    """
+    Times loading `VIOLATION_REGISTRY` from the JSON against the snapshot it is now
+    loaded from. The snapshot is made current first, so only `snapshot_compile` pays
+    for a rebuild.
+    """
+    run_snippet(LOAD_SNIPPETS['snapshot'])
+
+    results = {name: summarize([run_snippet(snippet) for _ in range(repeat)])
+               for name, snippet in LOAD_SNIPPETS.items()}
+    results['speedup'] = results['json']['median'] / results['snapshot']['median']
+    return results
+
+
+def bench_update_data(modes: tuple[str, ...] = ('off', 'lazy')) -> dict[str, dict]:
+    """
+    Times an `update_data` request per code, end to end, with responses rendered by
+    Dash on every click ('off') and served from the prerendered cache ('lazy'). The
+    first click on each code renders it in both modes; later clicks are where they
+    differ. Also reports the bytes sent, and `prerendered.bytes` held by the cache.
+    """
+    results = {}
+    for mode in modes:
+        result = subprocess.run([sys.executable, '-c', CLICK_SNIPPET], cwd=APP_DIR,
+                                env={**os.environ, 'Y25W24_PRERENDER': mode},
+                                capture_output=True, text=True, check=True)
+        samples = json.loads(result.stdout)
+        results[mode] = {'first_click': summarize(samples['first']),
+                         'repeat_click': summarize(samples['second']),
+                         'response_bytes': samples['response_bytes'],
+                         'prerendered': samples['prerendered']}
+    return results
+
+
+def bench_parse(rows: int = 1_000_000, repeat: int = 3) -> dict[str, dict]:
+    """
+    Times preparing `rows` synthetic API records (see `synthetic_records`): parsing
+    issue dates and times, and labelling their hour and day of week
+    """
+    result = subprocess.run([sys.executable, '-c', PARSE_SNIPPET.format(rows=rows, repeat=repeat)], cwd=APP_DIR,
+                            capture_output=True, text=True, check=True)
+    samples = json.loads(result.stdout)
+    results = {name: summarize(samples[name]) for name in ['legacy', 'vectorized']}
+    results['speedup'] = results['legacy']['median'] / results['vectorized']['median']
+    results['rows'], results['kept'] = samples['rows'], samples['kept']
+    return results
+
+
+def bench_aggregate(rows: int = 2_000_000, memory_limits: tuple[int, ...] = (384 * 2**20, 1024 * 2**20)) -> dict[str, dict]:
+    """
+    Peak RSS and time of aggregating a month of `rows` synthetic records (in daily
+    partitions) from one whole-month frame ('month'), against streaming them within
+    each of `memory_limits`. Each run is a fresh process, since the peak only grows;
+    `identical` is whether they all wrote the same JSON.
+    """
+    results, outputs = {}, []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = Path(tmp_dir) / 'partitions'
+        data_dir.mkdir()
+        subprocess.run([sys.executable, '-c', AGGREGATE_SETUP_SNIPPET.format(rows=rows, data_dir=data_dir)], cwd=APP_DIR,
+                       capture_output=True, text=True, check=True)
+
+        for memory_limit in (None, *memory_limits):
+            name = 'month' if memory_limit is None else f'{memory_limit / 2**20:.0f}MiB'
+            output = Path(tmp_dir) / f'{name}.json'
+            snippet = AGGREGATE_SNIPPET.format(data_dir=data_dir, memory_limit=memory_limit, output=output)
+            result = subprocess.run([sys.executable, '-c', snippet], cwd=APP_DIR, capture_output=True, text=True, check=True)
+            results[name] = {**json.loads(result.stdout), 'memory_limit': memory_limit}
+            outputs.append(output.read_bytes())
+
+    results['identical'] = len(set(outputs)) == 1
+    results['rows'] = rows
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Synthetic records to prepare")
+    parser.add_argument('--month-rows', type=int, default=2_000_000, help="Synthetic records in the month to aggregate")
+    args = parser.parse_args()
+
+    print(json.dumps({'cold_start': bench_cold_start(args.repeat),
+                      'update_data': bench_update_data(),
+                      'parse': bench_parse(args.rows),
+                      'aggregate': bench_aggregate(args.month_rows)}, indent=2))
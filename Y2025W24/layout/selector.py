@@ -1,3 +1,4 @@
+import functools
 from typing import Literal
 
 from dash_iconify import DashIconify
@@ -24,6 +25,23 @@ def increment_button(button_id: str, direction: Literal['+', '-'], color: str) -
     )
 
 
+@functools.cache
+def menu_items() -> list[dmc.MenuItem]:
+    """One item per violation code; static, so built once and reused"""
+    return [
+        dmc.MenuItem(
+            dmc.Group([
+                dmc.Text(f"{v.code:0>2}", w=22),
+                dmc.Text(v.description.title(), w=300),
+                dmc.Text(f"{v.total_count:,.0f}", ta='right', w=100),
+            ]),
+            id={'type': 'select-code-button', 'index': i},
+            n_clicks=0,
+        )
+        for i, v in enumerate(VIOLATION_REGISTRY)
+    ]
+
+
 def select_menu(label: str, text_id: str, button_id: str, color: str) -> dmc.Menu:
     target = dmc.Button(
         children=[
@@ -45,21 +63,8 @@ def select_menu(label: str, text_id: str, button_id: str, color: str) -> dmc.Men
         w=200
     )
 
-    menu_items = [
-        dmc.MenuItem(
-            dmc.Group([
-                dmc.Text(f"{v.code:0>2}", w=22),
-                dmc.Text(v.description.title(), w=300),
-                dmc.Text(f"{v.total_count:,.0f}", ta='right', w=100),
-            ]),
-            id={'type': 'select-code-button', 'index': i},
-            n_clicks=0,
-        )
-        for i, v in enumerate(VIOLATION_REGISTRY)
-    ]
-
     drop_down = dmc.ScrollArea(
-        children=menu_items,
+        children=menu_items(),
         type="hover",
         scrollbarSize=16,
         scrollHideDelay=1000,
@@ -1,10 +1,13 @@
-from dash import dcc
+import functools
+
+from dash import dcc, Patch
 from dash_iconify import DashIconify
 import dash_mantine_components as dmc
+import numpy as np
 import plotly.graph_objects as go
 
-from models import Violation
-from utils import format_number_si
+from models import HOUR_DOW_COLUMNS, HOUR_DOW_ROWS, Violation
+from utils import format_number_si, typed_array
 
 
 # CORE ELEMENTS
@@ -33,20 +36,31 @@ def legend_item(color: str, label: str, value: int | float) -> dmc.Group:
     )
 
 
-def plotly_heat_map(v: Violation) -> go.Figure:
+def heat_map_zmax(z: np.ndarray) -> float:
+    return 1 if z.max()==1 else z.max()
+
+
+def heat_map_z(v: Violation) -> dict[str, str]:
+    """`hour_dow_counts` as a typed array; whole counts, so int32 at half the bytes of float64"""
+    return typed_array(v.hour_dow_counts.astype(np.int32))
+
+
+@functools.cache
+def base_heat_map() -> dict:
+    """
+    Everything in the heat map but `z` and `zmax`, validated once and kept as a plain
+    dict. Built on first use, so after `set_custom_template_as_default` in `app.py`.
+    """
     colors = ['rgba(39, 17, 23, 0.7)', 'rgba(51, 19, 23, 0.75)', 'rgba(79, 28, 33, 0.8)', 'rgba(108, 36, 36, 0.85)', 'rgba(135, 47, 32, 0.9)', 'rgba(157, 66, 25, 0.95)', 'rgba(174, 88, 20, 1)', 'rgba(188, 111, 19, 1)', 'rgba(199, 137, 22, 1)', 'rgba(209, 164, 32, 1)', 'rgba(217, 192, 44, 1)', 'rgba(222, 222, 59, 1)', 'rgba(224, 253, 74, 1)']
 
-    x = [c[0].lower() if c[0] not in ['S', 'T'] else c[:2].lower() for c in v.hour_dow_columns]
-    y = [h.lower() for h in v.hour_dow_rows]
-    z = v.hour_dow_counts
+    x = [c[0].lower() if c[0] not in ['S', 'T'] else c[:2].lower() for c in HOUR_DOW_COLUMNS]
+    y = [h.lower() for h in HOUR_DOW_ROWS]
 
     fig = go.Figure(go.Heatmap(
         x=x,
         y=y,
-        z=z,
         colorscale=colors,
         zmin=0,
-        zmax=1 if z.max()==1 else z.max(),
         hoverongaps=False,
         showscale=False,
         xgap=3.5,
@@ -76,7 +90,22 @@ def plotly_heat_map(v: Violation) -> go.Figure:
             side='right'
         )
     )
-    return fig
+    return fig.to_dict()
+
+
+def plotly_heat_map(v: Violation) -> dict:
+    """Full figure for the initial layout; callbacks send `heat_map_patch` instead"""
+    base = base_heat_map()
+    trace = {**base['data'][0], 'z': heat_map_z(v), 'zmax': heat_map_zmax(v.hour_dow_counts)}
+    return {**base, 'data': [trace]}
+
+
+def heat_map_patch(v: Violation) -> Patch:
+    """Updates the displayed heat map to `v`, leaving its layout and trace settings alone"""
+    patch = Patch()
+    patch['data'][0]['z'] = heat_map_z(v)
+    patch['data'][0]['zmax'] = heat_map_zmax(v.hour_dow_counts)
+    return patch
 
 
 def dmc_waterfall(v: Violation, waterfall_id: str) -> dmc.BarChart:
@@ -1,42 +1,73 @@
+import functools
 from collections import defaultdict
 from dataclasses import dataclass, field, asdict
 from typing import Any
 
 import numpy as np
 
+from snapshot import KEY_TABLES, TOTAL_FIELDS, ViolationSnapshot
+
+
+# Hearing and appeal outcomes: violation status -> group, and group colors in chart order
+HEARING_GROUPS = {'none': 'no contest',
+                  'HEARING HELD-GUILTY': 'guilty',
+                  'HEARING HELD-REINSTATEMENT': 'guilty',
+                  'HEARING HELD-GUILTY REDUCTION': 'guilty reduced',
+                  'ADMIN REDUCTION': 'guilty reduced',
+                  'HEARING HELD-NOT GUILTY': 'not guilty',
+                  'APPEAL AFFIRMED': 'appeal outcome',
+                  'APPEAL REVERSED': 'appeal outcome',
+                  'APPEAL MODIFIED': 'appeal outcome',
+                  'APPEAL ABANDONED': 'appeal outcome',
+                  'ADMIN CLAIM GRANTED': 'administrative review',
+                  'ADMIN CLAIM DENIED': 'administrative review',
+                  'HEARING ADJOURNMENT': 'pending or adjourned',
+                  'HEARING PENDING': 'pending or adjourned',
+                  }
+
+HEARING_COLORS = {'no contest': '#D6B527dd',
+                  'guilty': '#B05C14dd',
+                  'guilty reduced': '#7C2C20dd',
+                  'administrative review': '#3F181Edd',
+                  'not guilty': '#07bad5dd',
+                  'appeal outcome': '#035E86dd',
+                  'pending or adjourned': '#024764dd',
+                  }
+
+OTHER_HEARING_GROUP = "other outcomes"  # Statuses missing from `HEARING_GROUPS`; not charted
+
+# Labels of the `hour_dow_counts` columns and rows
+HOUR_DOW_COLUMNS = ('Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat')
+HOUR_DOW_ROWS = ('12 AM', '1 AM', '2 AM', '3 AM', '4 AM', '5 AM',
+                 '6 AM', '7 AM', '8 AM', '9 AM', '10 AM', '11 AM',
+                 '12 PM', '1 PM', '2 PM', '3 PM', '4 PM', '5 PM',
+                 '6 PM', '7 PM', '8 PM', '9 PM', '10 PM', '11 PM')
+
+
+class ViolationBase:
+    """Labels and chart data shared by `ViolationRecord` and `Violation`"""
+    __slots__ = ()
 
-@dataclass
-class Violation:
     code: int
-    description: str
-    definition: str = field(repr=False)
-    fine_amount_manhattan_96st_and_below: list[int] = field(repr=False)
-    fine_amount_all_other_areas: list[int] = field(repr=False)
-    total_count: int = field(repr=False, default=0)
-    total_fine: int = field(repr=False, default=0)
-    total_penalty: int = field(repr=False, default=0)
-    total_interest: int = field(repr=False, default=0)
-    total_reduction: int = field(repr=False, default=0)
-    total_payment: int = field(repr=False, default=0)
-    total_due: int = field(repr=False, default=0)
-    period_count: dict[str, int] = field(repr=False, default_factory=dict)
-    period_fine: dict[str, int] = field(repr=False, default_factory=dict)
-    statuses: dict[str, int] = field(repr=False, default_factory=dict)
-    agencies: dict[str, int] = field(repr=False, default_factory=dict)
-    states: dict[str, int] = field(repr=False, default_factory=dict)
-    license_types: dict[str, int] = field(repr=False, default_factory=dict)
-    hour_dow_counts: np.array = field(repr=False, default_factory=lambda: np.zeros((24, 7), dtype=np.int64))
-    
+    fine_amount_manhattan_96st_and_below: list[int]
+    fine_amount_all_other_areas: list[int]
+    total_count: int
+    total_fine: int
+    total_penalty: int
+    total_interest: int
+    total_reduction: int
+    total_payment: int
+    total_due: int
+    statuses: dict[str, int]
+    hour_dow_counts: np.ndarray
+
     @property
     def hour_dow_columns(self) -> tuple[str, ...]:
-        return ('Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat')
-    
+        return HOUR_DOW_COLUMNS
+
     @property
     def hour_dow_rows(self) -> tuple[str, ...]:
-        return ('12 AM', '1 AM', '2 AM', '3 AM', '4 AM', '5 AM',
-                '6 AM', '7 AM', '8 AM', '9 AM', '10 AM', '11 AM',
-                '12 PM', '1 PM', '2 PM', '3 PM', '4 PM', '5 PM',
-                '6 PM', '7 PM', '8 PM', '9 PM', '10 PM', '11 PM')
+        return HOUR_DOW_ROWS
 
     @property
     def label(self) -> str:
@@ -47,25 +78,11 @@ class Violation:
     @property
     def fine_name_manhattan_96st_and_below(self) -> str:
         return "Manhattan ≤ 96 Street"
-    
+
     @property
     def fine_name_all_other_areas(self) -> str:
         return "all other areas"
 
-    @classmethod
-    def from_dict(cls, data: dict) -> "Violation":
-        data = data.copy()
-        hour_dow_counts = np.array(
-            data.pop('hour_dow_counts', np.zeros((24, 7)))
-        )
-        return cls(**data, hour_dow_counts=hour_dow_counts)
-    
-    def to_dict(self) -> dict[str, Any]:
-        return {
-            **asdict(self),
-            "hour_dow_counts": self.hour_dow_counts.tolist()
-        }
-
     @staticmethod
     def _int_as_ordinal(n: int) -> str:
         if 10 <= (n % 100) <= 20:
@@ -73,7 +90,7 @@ class Violation:
         else:
             suffix = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
         return f"{n}{suffix}"
-    
+
     def get_fines_as_list(self, default: str = 'N/A') -> list[tuple[str, str]]:
         manhattan_fines = self.fine_amount_manhattan_96st_and_below.copy()
         all_other_fines = self.fine_amount_all_other_areas.copy()
@@ -94,7 +111,7 @@ class Violation:
             else:
                 output.append((k, default))
         return output
-    
+
     def get_totals_as_list(self) -> list[tuple[str, str]]:
         return [('issued', f"{self.total_count:,.0f}"),
                 ('paid', f"${self.total_payment:,.0f}"),
@@ -109,37 +126,266 @@ class Violation:
             {"item": "payment", "total": -self.total_payment, "color": "#D4AE24"},
             {"item": "due", "total": self.total_due, "color": "#07bad5", "standalone": True},
         ]
-    
-    def get_hearing_data(self) -> list[dict]:
-        hearing_map = {'none': 'no contest',
-                       'HEARING HELD-GUILTY': 'guilty',
-                       'HEARING HELD-REINSTATEMENT': 'guilty',
-                       'HEARING HELD-GUILTY REDUCTION': 'guilty reduced',
-                       'ADMIN REDUCTION': 'guilty reduced',
-                       'HEARING HELD-NOT GUILTY': 'not guilty',
-                       'APPEAL AFFIRMED': 'appeal outcome',
-                       'APPEAL REVERSED': 'appeal outcome',
-                       'APPEAL MODIFIED': 'appeal outcome',
-                       'APPEAL ABANDONED': 'appeal outcome',
-                       'ADMIN CLAIM GRANTED': 'administrative review',
-                       'ADMIN CLAIM DENIED': 'administrative review',
-                       'HEARING ADJOURNMENT': 'pending or adjourned',
-                       'HEARING PENDING': 'pending or adjourned',
-                    }
-
-        color_map = {'no contest': '#D6B527dd',
-                     'guilty': '#B05C14dd',
-                     'guilty reduced': '#7C2C20dd',
-                     'administrative review': '#3F181Edd',
-                     'not guilty': '#07bad5dd',
-                     'appeal outcome': '#035E86dd',
-                     'pending or adjourned': '#024764dd',
-                     }
 
+    def get_hearing_data(self) -> list[dict]:
         grouped_counts = defaultdict(int)
         for status_code, count in self.statuses.items():
-            group = hearing_map.get(status_code, "other outcomes")
+            group = HEARING_GROUPS.get(status_code, OTHER_HEARING_GROUP)
             grouped_counts[group] += count
-        
+
         return [{'name': key, 'value': grouped_counts[key], 'color': color}
-                for key, color in color_map.items()]
+                for key, color in HEARING_COLORS.items()]
+
+
+@dataclass
+class ViolationRecord(ViolationBase):
+    """Mutable violation data, used to aggregate the source records and to serialize them"""
+    code: int
+    description: str
+    definition: str = field(repr=False)
+    fine_amount_manhattan_96st_and_below: list[int] = field(repr=False)
+    fine_amount_all_other_areas: list[int] = field(repr=False)
+    total_count: int = field(repr=False, default=0)
+    total_fine: int = field(repr=False, default=0)
+    total_penalty: int = field(repr=False, default=0)
+    total_interest: int = field(repr=False, default=0)
+    total_reduction: int = field(repr=False, default=0)
+    total_payment: int = field(repr=False, default=0)
+    total_due: int = field(repr=False, default=0)
+    period_count: dict[str, int] = field(repr=False, default_factory=dict)
+    period_fine: dict[str, int] = field(repr=False, default_factory=dict)
+    statuses: dict[str, int] = field(repr=False, default_factory=dict)
+    agencies: dict[str, int] = field(repr=False, default_factory=dict)
+    states: dict[str, int] = field(repr=False, default_factory=dict)
+    license_types: dict[str, int] = field(repr=False, default_factory=dict)
+    hour_dow_counts: np.array = field(repr=False, default_factory=lambda: np.zeros((24, 7), dtype=np.int64))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ViolationRecord":
+        data = data.copy()
+        hour_dow_counts = np.array(
+            data.pop('hour_dow_counts', np.zeros((24, 7)))
+        )
+        return cls(**data, hour_dow_counts=hour_dow_counts)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "hour_dow_counts": self.hour_dow_counts.tolist()
+        }
+
+
+class ViolationTable:
+    """
+    Every violation code in shared arrays, one row per code: the hour/day-of-week
+    cube, a totals matrix, and a (n_codes, n_keys) matrix per dict field (periods,
+    statuses, agencies, states, license types) whose columns are listed in `keys`.
+    Arrays come straight from a `ViolationSnapshot`, so they are not copied per worker,
+    and aggregating across codes is a single reduction (see `sum`).
+    Index the table (or iterate over it) for `Violation` views of single codes.
+    """
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.arrays: dict[str, np.ndarray] = arrays
+        self.codes: np.ndarray = arrays['code']
+        self.totals: np.ndarray = arrays['totals']  # (n_codes, 7), columns as in `TOTAL_FIELDS`
+        self.hour_dow_counts: np.ndarray = arrays['hour_dow_counts']  # (n_codes, 24, 7)
+
+        # Matrix columns of each dict field, e.g. the week start dates of `period_count`
+        key_tables = {table: arrays[f'{table}.keys'].tolist() for table in set(KEY_TABLES.values())}
+        self.keys: dict[str, list[str]] = {field: key_tables[table] for field, table in KEY_TABLES.items()}
+
+        self._views: list[Violation] = [Violation(self, i) for i in range(len(self.codes))]
+        self._hearing_data: dict[int, list[dict]] = {}
+
+    def __repr__(self):
+        return f"ViolationTable(num_codes={len(self)})"
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> "Violation":
+        return self._views[i]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ViolationSnapshot) -> "ViolationTable":
+        return cls(snapshot.arrays)
+
+    def matrix(self, field: str) -> np.ndarray:
+        """(n_codes, n_keys) values of dict `field`, zero where a code has no such key"""
+        return self.arrays[field]
+
+    def sum(self, field: str, rows: list[int] | np.ndarray | None = None) -> np.ndarray:
+        """
+        Sum of a numeric field (a total, `hour_dow_counts`, or a dict field) over the
+        codes at `rows`, or over every code.
+        """
+        if field in TOTAL_FIELDS:
+            values = self.totals[:, TOTAL_FIELDS.index(field)]
+        elif field == 'hour_dow_counts':
+            values = self.hour_dow_counts
+        else:
+            values = self.matrix(field)
+        return (values if rows is None else values[rows]).sum(axis=0)
+
+    @functools.cached_property
+    def hearing_counts(self) -> np.ndarray:
+        """
+        (n_codes, n_groups) status counts per hearing group, columns in `HEARING_COLORS`
+        order followed by `OTHER_HEARING_GROUP`. Each status column of the statuses
+        matrix is mapped to its group once, so every code is grouped in one product.
+        """
+        groups = list(HEARING_COLORS) + [OTHER_HEARING_GROUP]
+        group_index = [groups.index(HEARING_GROUPS.get(s, OTHER_HEARING_GROUP)) for s in self.keys['statuses']]
+
+        statuses = self.matrix('statuses')
+        membership = np.zeros((statuses.shape[1], len(groups)), dtype=statuses.dtype)
+        membership[np.arange(len(group_index)), group_index] = 1
+        return statuses @ membership
+
+    def hearing_data(self, i: int) -> list[dict]:
+        """`Violation.get_hearing_data` of the code at row `i`; cached, so do not mutate"""
+        if i not in self._hearing_data:
+            counts = self.hearing_counts[i].tolist()
+            self._hearing_data[i] = [{'name': key, 'value': value, 'color': color}
+                                     for (key, color), value in zip(HEARING_COLORS.items(), counts)]
+        return self._hearing_data[i]
+
+    def text(self, field: str, i: int) -> str:
+        return str(self.arrays[field][i])
+
+    def total(self, field: str, i: int) -> int | float:
+        return self.totals[i, TOTAL_FIELDS.index(field)].item()
+
+    def values(self, field: str, i: int) -> list:
+        """Values of list `field` for the code at row `i`"""
+        offsets = self.arrays[f'{field}.offsets']
+        return self.arrays[f'{field}.values'][offsets[i]:offsets[i + 1]].tolist()
+
+    def mapping(self, field: str, i: int) -> dict:
+        """Dict `field` for the code at row `i`, with its keys in their original order"""
+        offsets = self.arrays[f'{field}.offsets']
+        key_index = self.arrays[f'{field}.index'][offsets[i]:offsets[i + 1]]
+        keys = self.keys[field]
+        return dict(zip([keys[k] for k in key_index.tolist()], self.matrix(field)[i, key_index].tolist()))
+
+
+class Violation(ViolationBase):
+    """
+    Read-only view of one violation code in a `ViolationTable`. Fields are read from
+    the table's arrays on access, so a view is just a table and a row number.
+    """
+    __slots__ = ('table', 'i')
+
+    def __init__(self, table: ViolationTable, i: int):
+        self.table: ViolationTable = table
+        self.i: int = i  # Row of this code in the table
+
+    def __repr__(self):
+        return f"Violation(code={self.code}, description={self.description!r})"
+
+    @property
+    def code(self) -> int:
+        return int(self.table.codes[self.i])
+
+    @property
+    def description(self) -> str:
+        return self.table.text('description', self.i)
+
+    @property
+    def definition(self) -> str:
+        return self.table.text('definition', self.i)
+
+    @property
+    def fine_amount_manhattan_96st_and_below(self) -> list[int]:
+        return self.table.values('fine_amount_manhattan_96st_and_below', self.i)
+
+    @property
+    def fine_amount_all_other_areas(self) -> list[int]:
+        return self.table.values('fine_amount_all_other_areas', self.i)
+
+    @property
+    def total_count(self) -> int:
+        return self.table.total('total_count', self.i)
+
+    @property
+    def total_fine(self) -> int:
+        return self.table.total('total_fine', self.i)
+
+    @property
+    def total_penalty(self) -> int:
+        return self.table.total('total_penalty', self.i)
+
+    @property
+    def total_interest(self) -> int:
+        return self.table.total('total_interest', self.i)
+
+    @property
+    def total_reduction(self) -> int:
+        return self.table.total('total_reduction', self.i)
+
+    @property
+    def total_payment(self) -> int:
+        return self.table.total('total_payment', self.i)
+
+    @property
+    def total_due(self) -> int:
+        return self.table.total('total_due', self.i)
+
+    @property
+    def period_count(self) -> dict[str, int]:
+        return self.table.mapping('period_count', self.i)
+
+    @property
+    def period_fine(self) -> dict[str, float]:
+        return self.table.mapping('period_fine', self.i)
+
+    @property
+    def statuses(self) -> dict[str, int]:
+        return self.table.mapping('statuses', self.i)
+
+    @property
+    def agencies(self) -> dict[str, int]:
+        return self.table.mapping('agencies', self.i)
+
+    @property
+    def states(self) -> dict[str, int]:
+        return self.table.mapping('states', self.i)
+
+    @property
+    def license_types(self) -> dict[str, int]:
+        return self.table.mapping('license_types', self.i)
+
+    @property
+    def hour_dow_counts(self) -> np.ndarray:
+        """(24, 7) view into the table's cube, read-only"""
+        return self.table.hour_dow_counts[self.i]
+
+    def get_hearing_data(self) -> list[dict]:
+        return self.table.hearing_data(self.i)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Same as `ViolationRecord.to_dict` for the record this snapshot was built from"""
+        return {
+            'code': self.code,
+            'description': self.description,
+            'definition': self.definition,
+            'fine_amount_manhattan_96st_and_below': self.fine_amount_manhattan_96st_and_below,
+            'fine_amount_all_other_areas': self.fine_amount_all_other_areas,
+            'total_count': self.total_count,
+            'total_fine': self.total_fine,
+            'total_penalty': self.total_penalty,
+            'total_interest': self.total_interest,
+            'total_reduction': self.total_reduction,
+            'total_payment': self.total_payment,
+            'total_due': self.total_due,
+            'period_count': self.period_count,
+            'period_fine': self.period_fine,
+            'statuses': self.statuses,
+            'agencies': self.agencies,
+            'states': self.states,
+            'license_types': self.license_types,
+            'hour_dow_counts': self.hour_dow_counts.tolist()
+        }
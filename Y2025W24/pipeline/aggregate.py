@@ -0,0 +1,387 @@
+import functools
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from models import HOUR_DOW_COLUMNS, HOUR_DOW_ROWS, ViolationRecord
+from pipeline.dataset import dataset_filter, iter_violation_dataset, open_violation_dataset
+from pipeline.memory import batch_size_for, workers_for
+from pipeline.parallel import ordered_map, tree_reduce
+from pipeline.records import AGGREGATE_COLUMNS, AMOUNT_COLUMNS, CATEGORY_COLUMNS, MISSING_CATEGORY, iter_partition, prepare_records
+from snapshot import TOTAL_FIELDS
+
+
+ALL_VIOLATIONS_DESCRIPTION = "ALL VIOLATIONS"
+ALL_VIOLATIONS_DEFINITION = "An aggregation of all parking and camera violations for 2023 as of June 18, 2025. Records missing issue date, violation, or fine amount are omitted along with records assigned to \"BLUE ZONE\", which is no longer a valid NYC violation."
+
+HOUR_DOW_SHAPE = (len(HOUR_DOW_ROWS), len(HOUR_DOW_COLUMNS))
+
+Keyed = dict[str, np.ndarray]  # Key (a week or a category) -> value per code
+
+
+def _merge_keyed(a: Keyed, b: Keyed) -> Keyed:
+    merged = dict(a)
+    for key, values in b.items():
+        merged[key] = merged[key] + values if key in merged else values
+    return merged
+
+
+def _stack_keyed(keyed: Keyed, keys: list[str], n_codes: int, dtype) -> np.ndarray:
+    """(n_codes, len(keys)) matrix of `keyed`, for storage"""
+    if not keys:
+        return np.zeros((n_codes, 0), dtype=dtype)
+    return np.stack([keyed[key] for key in keys], axis=1).astype(dtype, copy=False)
+
+
+@dataclass
+class MonthlyAggregate:
+    """
+    Partial aggregates of one calendar month of records, one row per violation code (in
+    `violation_details` order). The month is the unit the registry is built from, and
+    aggregates of partitions within it (e.g., days) add up with `merge`.
+    """
+    counts: np.ndarray  # (n_codes,) records
+    amounts: np.ndarray  # (n_codes, len(AMOUNT_COLUMNS)) sums, in whole cents
+    hour_dow_counts: np.ndarray  # (n_codes, 24, 7) records
+    period_count: Keyed = field(default_factory=dict)  # Week start (ISO date) -> records per code
+    period_fine: Keyed = field(default_factory=dict)  # Week start (ISO date) -> fine amounts per code, in whole cents
+    categories: dict[str, Keyed] = field(default_factory=lambda: {f: {} for f in CATEGORY_COLUMNS})  # Counter field -> category -> records per code
+
+    def merge(self, other: "MonthlyAggregate") -> "MonthlyAggregate":
+        return MonthlyAggregate(
+            counts=self.counts + other.counts,
+            amounts=self.amounts + other.amounts,
+            hour_dow_counts=self.hour_dow_counts + other.hour_dow_counts,
+            period_count=_merge_keyed(self.period_count, other.period_count),
+            period_fine=_merge_keyed(self.period_fine, other.period_fine),
+            categories={f: _merge_keyed(self.categories[f], other.categories[f]) for f in CATEGORY_COLUMNS},
+        )
+
+
+def _factorize_category(values: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """Category index per record, with blanks counted as `MISSING_CATEGORY`"""
+    codes, uniques = pd.factorize(values)
+    keys = uniques.tolist()
+    if (codes < 0).any():
+        if MISSING_CATEGORY not in keys:
+            keys.append(MISSING_CATEGORY)
+        codes[codes < 0] = keys.index(MISSING_CATEGORY)
+    return codes, keys
+
+
+def _cents(values: pd.Series) -> np.ndarray:
+    """
+    Amounts in whole cents (as floats, for `np.bincount` weights). Their sums are exact,
+    so they do not depend on how records are split up or merged, and round like the
+    (compensated) float sums `groupby` used to make.
+    """
+    return np.rint(np.nan_to_num(values.to_numpy(dtype=np.float64)) * 100)
+
+
+def aggregate_records(df: pd.DataFrame, code_index: dict[str, int]) -> dict[str, MonthlyAggregate]:
+    """
+    Aggregates of prepared records (see `prepare_records`) per month of issue date.
+    Violations missing from `code_index` (e.g., "BLUE ZONE") are left out.
+
+    Every key column is factorized once, and each aggregate is a single `np.bincount`
+    over the combined (month, [key,] code) index, rather than one `groupby` per output.
+    """
+    n_codes = len(code_index)
+
+    violation, violation_keys = pd.factorize(df['violation'])
+    lookup = np.array([code_index.get(key, -1) for key in violation_keys] + [-1], dtype=np.int64)
+    code = lookup[violation]  # -1 (the last entry) for blanks too
+    keep = code >= 0
+    code = code[keep]
+
+    days = df['issue_date'].to_numpy()[keep].astype('datetime64[D]')
+    month, month_keys = pd.factorize(days.astype('datetime64[M]'))
+    week, week_keys = pd.factorize(days - (days.astype(np.int64) + 3) % 7)  # Back to Monday; 1970-01-01 was a Thursday
+    hour = df['hour'].cat.codes.to_numpy()[keep].astype(np.int64)
+    dow = df['day_of_week'].cat.codes.to_numpy()[keep].astype(np.int64)
+    fine = _cents(df['fine_amount'])[keep]
+
+    n_months, n_weeks = len(month_keys), len(week_keys)
+    month_code = month * n_codes + code
+    size = n_months * n_codes
+
+    counts = np.bincount(month_code, minlength=size).reshape(n_months, n_codes)
+    amounts = np.stack([np.bincount(month_code, weights=_cents(df[col])[keep], minlength=size) for col in AMOUNT_COLUMNS], axis=-1)
+    amounts = amounts.reshape(n_months, n_codes, len(AMOUNT_COLUMNS))
+    hour_dow_counts = np.bincount((month_code * 24 + hour) * 7 + dow, minlength=size * 168)
+    hour_dow_counts = hour_dow_counts.reshape(n_months, n_codes, *HOUR_DOW_SHAPE)
+
+    month_week_code = (month * n_weeks + week) * n_codes + code
+    period_count = np.bincount(month_week_code, minlength=size * n_weeks).reshape(n_months, n_weeks, n_codes)
+    period_fine = np.bincount(month_week_code, weights=fine, minlength=size * n_weeks).reshape(n_months, n_weeks, n_codes)
+    period_keys = np.datetime_as_string(week_keys, unit='D').tolist()
+
+    categories = {}
+    for f, col in CATEGORY_COLUMNS.items():
+        category, category_keys = _factorize_category(df[col][keep])
+        n_keys = len(category_keys)
+        category_counts = np.bincount((month * n_keys + category) * n_codes + code, minlength=size * n_keys)
+        categories[f] = (category_counts.reshape(n_months, n_keys, n_codes), category_keys)
+
+    monthly = {}
+    for m, month_key in enumerate(np.datetime_as_string(month_keys, unit='M').tolist()):
+        weeks = np.flatnonzero(period_count[m].any(axis=1))
+        monthly[month_key] = MonthlyAggregate(
+            counts=counts[m],
+            amounts=amounts[m],
+            hour_dow_counts=hour_dow_counts[m],
+            period_count={period_keys[w]: period_count[m, w] for w in weeks},
+            period_fine={period_keys[w]: period_fine[m, w] for w in weeks},
+            categories={f: {keys[k]: matrix[m, k] for k in np.flatnonzero(matrix[m].any(axis=1))}
+                        for f, (matrix, keys) in categories.items()},
+        )
+    return monthly
+
+
+def merge_monthly(a: dict[str, MonthlyAggregate], b: dict[str, MonthlyAggregate]) -> dict[str, MonthlyAggregate]:
+    merged = dict(a)
+    for month, agg in b.items():
+        merged[month] = merged[month].merge(agg) if month in merged else agg
+    return merged
+
+
+def aggregate_partition(filepath: str | Path, code_index: dict[str, int], batch_size: int = 250_000) -> dict[str, MonthlyAggregate]:
+    """
+    Aggregates of a stored partition, read (only the columns needed) and prepared
+    `batch_size` records at a time, so memory does not grow with the partition
+    """
+    batches = iter_partition(filepath, AGGREGATE_COLUMNS, batch_size)
+    return tree_reduce((aggregate_records(prepare_records(df), code_index) for df in batches), merge_monthly) or {}
+
+
+def aggregate_partitions(filepaths: list[str | Path],
+                         code_index: dict[str, int],
+                         workers: int | None = None,
+                         batch_size: int = 250_000,
+                         memory_limit: int | None = None) -> dict[str, MonthlyAggregate]:
+    """
+    Aggregates of all `filepaths`, each partition aggregated independently by a pool of
+    `workers` processes (see `ordered_map`), then combined by `tree_reduce`. The
+    result does not depend on `workers`; with 1 everything runs in this process.
+
+    Only a batch of records per process and the partial aggregates are held at a time.
+    With a `memory_limit` (bytes, for all processes together), there are only as many
+    workers as fit, and the batch size is the largest that fits instead of `batch_size`,
+    by the estimates of `pipeline.memory` (the limit is not enforced).
+    """
+    workers = workers or os.cpu_count() or 1
+    if memory_limit is not None:
+        workers = workers_for(memory_limit, workers)
+        batch_size = batch_size_for(memory_limit, 1 if workers == 1 else workers + 1)  # The pool, and this process
+
+    func = functools.partial(aggregate_partition, code_index=code_index, batch_size=batch_size)
+    return tree_reduce(ordered_map(func, [str(fp) for fp in filepaths], workers), merge_monthly) or {}
+
+
+def aggregate_dataset(dataset_dir: str | Path,
+                      violation_details: list[dict],
+                      codes: list[int] | None = None,
+                      months: list[str] | None = None,
+                      batch_size: int = 250_000,
+                      memory_limit: int | None = None) -> dict[str, MonthlyAggregate]:
+    """
+    Aggregates of violation `codes` in `months` ('YYYY-MM'), all by default, read from
+    the partitioned dataset (see `write_violation_dataset`): only their partitions, and
+    only the columns needed. `memory_limit` sets the batch size as for `aggregate_partitions`.
+    """
+    if memory_limit is not None:
+        batch_size = batch_size_for(memory_limit)
+    code_index = {v['description']: i for i, v in enumerate(violation_details)}
+    batches = iter_violation_dataset(open_violation_dataset(dataset_dir), violation_details, AGGREGATE_COLUMNS,
+                                     dataset_filter(codes, months), batch_size)
+    return tree_reduce((aggregate_records(prepare_records(df), code_index) for df in batches), merge_monthly) or {}
+
+
+class ViolationAggregator:
+    """
+    Incremental build of the violation data: mergeable aggregates per (code, month), and
+    the partitions already merged into them, so a new partition (e.g., a new day of
+    records) only adds its own delta. `save`/`load` keep the state between runs.
+    """
+    def __init__(self, violation_details: list[dict]):
+        self.violation_details: list[dict] = violation_details  # Entries of `nyc_parking_violation_codes.json`
+        self.code_index: dict[str, int] = {v['description']: i for i, v in enumerate(violation_details)}
+
+        self.months: dict[str, MonthlyAggregate] = {}  # 'YYYY-MM' -> aggregates
+        self.partitions: set[str] = set()  # IDs of the partitions merged so far
+
+    @classmethod
+    def from_dataset(cls,
+                     dataset_dir: str | Path,
+                     violation_details: list[dict],
+                     codes: list[int] | None = None,
+                     months: list[str] | None = None,
+                     batch_size: int = 250_000,
+                     memory_limit: int | None = None) -> "ViolationAggregator":
+        """
+        Aggregates of only `codes` in `months` (see `aggregate_dataset`), e.g., to rebuild
+        one violation or time window; no partitions are recorded as merged
+        """
+        aggregator = cls(violation_details)
+        aggregator.months = aggregate_dataset(dataset_dir, violation_details, codes, months, batch_size, memory_limit)
+        return aggregator
+
+    def __repr__(self):
+        return (f"ViolationAggregator(num_codes={len(self.code_index)}, num_months={len(self.months)}, "
+                f"num_partitions={len(self.partitions)})")
+
+    def merge(self, partition_ids: list[str], monthly: dict[str, MonthlyAggregate]) -> None:
+        self.months = merge_monthly(self.months, monthly)
+        self.partitions.update(partition_ids)
+
+    def ingest(self, partition_id: str, records: pd.DataFrame) -> bool:
+        """Merges prepared `records`, unless `partition_id` already was; returns whether it merged"""
+        if partition_id in self.partitions:
+            return False
+        self.merge([partition_id], aggregate_records(records, self.code_index))
+        return True
+
+    def ingest_files(self,
+                     filepaths: list[str | Path],
+                     workers: int | None = None,
+                     batch_size: int = 250_000,
+                     memory_limit: int | None = None) -> list[str]:
+        """
+        Merges the stored partitions (identified by file name) not merged before, see
+        `aggregate_partitions`, and returns their IDs
+        """
+        new = {}
+        for fp in sorted(filepaths):
+            if Path(fp).name not in self.partitions:
+                new.setdefault(Path(fp).name, fp)
+
+        if new:
+            self.merge(list(new), aggregate_partitions(list(new.values()), self.code_index, workers, batch_size, memory_limit))
+        return list(new)
+
+    def save(self, filepath: str | Path) -> None:
+        """Writes the state to a single `.npz` file, replaced atomically"""
+        filepath = Path(filepath)
+        n_codes = len(self.code_index)
+        meta = {'codes': list(self.code_index), 'partitions': sorted(self.partitions), 'months': {}}
+
+        arrays = {}
+        for month, agg in self.months.items():
+            keys = {'periods': list(agg.period_count), **{f: list(agg.categories[f]) for f in CATEGORY_COLUMNS}}
+            meta['months'][month] = keys
+
+            arrays[f'{month}/counts'] = agg.counts
+            arrays[f'{month}/amounts'] = agg.amounts
+            arrays[f'{month}/hour_dow_counts'] = agg.hour_dow_counts
+            arrays[f'{month}/period_count'] = _stack_keyed(agg.period_count, keys['periods'], n_codes, np.int64)
+            arrays[f'{month}/period_fine'] = _stack_keyed(agg.period_fine, keys['periods'], n_codes, np.float64)
+            for f in CATEGORY_COLUMNS:
+                arrays[f'{month}/{f}'] = _stack_keyed(agg.categories[f], keys[f], n_codes, np.int64)
+
+        tmp_path = filepath.with_name(f'.{filepath.name}.tmp')
+        with open(tmp_path, 'wb') as fp:
+            np.savez_compressed(fp, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str | Path, violation_details: list[dict]) -> "ViolationAggregator":
+        aggregator = cls(violation_details)
+        with np.load(filepath, allow_pickle=False) as npz:
+            meta = json.loads(npz['meta'].item())
+            if meta['codes'] != list(aggregator.code_index):
+                raise ValueError(f"The aggregates in {str(filepath)!r} were built for different violation codes")
+
+            for month, keys in meta['months'].items():
+                def unstack(name: str, keys: list[str]) -> Keyed:
+                    matrix = npz[f'{month}/{name}']
+                    return {key: matrix[:, k].copy() for k, key in enumerate(keys)}
+
+                aggregator.months[month] = MonthlyAggregate(
+                    counts=npz[f'{month}/counts'],
+                    amounts=npz[f'{month}/amounts'],
+                    hour_dow_counts=npz[f'{month}/hour_dow_counts'],
+                    period_count=unstack('period_count', keys['periods']),
+                    period_fine=unstack('period_fine', keys['periods']),
+                    categories={f: unstack(f, keys[f]) for f in CATEGORY_COLUMNS},
+                )
+        aggregator.partitions = set(meta['partitions'])
+        return aggregator
+
+    def to_records(self) -> list[ViolationRecord]:
+        """
+        One `ViolationRecord` per code, merged month by month the way the registry always
+        has been: a week spanning two months keeps the later month's values, totals are
+        rounded per month, and counters merge in `Counter` order
+        """
+        violations = [ViolationRecord.from_dict(v) for v in self.violation_details]
+
+        for month in sorted(self.months):
+            agg = self.months[month]
+            periods = sorted(agg.period_count)
+            categories = {f: sorted(agg.categories[f]) for f in CATEGORY_COLUMNS}
+            amounts = np.round(agg.amounts / 100).astype(np.int64)
+
+            for i in np.flatnonzero(agg.counts):
+                v = violations[i]
+                v.total_count += agg.counts[i].item()
+
+                v_periods = [p for p in periods if agg.period_count[p][i]]
+                v.period_count.update({p: agg.period_count[p][i].item() for p in v_periods})
+                v.period_fine.update({p: agg.period_fine[p][i].item() / 100 for p in v_periods})
+
+                fine, penalty, interest, reduction, payment, due = amounts[i].tolist()
+                v.total_fine += fine
+                v.total_penalty += penalty
+                v.total_interest += interest
+                v.total_reduction += reduction
+                v.total_payment += payment
+                v.total_due += due
+
+                v.hour_dow_counts += agg.hour_dow_counts[i]
+
+                for f, keys in categories.items():
+                    counts = {key: agg.categories[f][key][i].item() for key in keys if agg.categories[f][key][i]}
+                    setattr(v, f, dict(Counter(counts) + Counter(getattr(v, f))))
+
+        return violations
+
+
+def all_violations_record(violations: list[ViolationRecord],
+                          description: str = ALL_VIOLATIONS_DESCRIPTION,
+                          definition: str = ALL_VIOLATIONS_DEFINITION) -> ViolationRecord:
+    """
+    The "all codes" row. Totals and the hour/day-of-week cube are summed as arrays; the
+    dicts merge code by code as before, since that order decides their ties
+    """
+    v_all = ViolationRecord(
+        code=0,
+        description=description,
+        definition=definition,
+        fine_amount_manhattan_96st_and_below=sorted({f for v in violations for f in v.fine_amount_manhattan_96st_and_below}),
+        fine_amount_all_other_areas=sorted({f for v in violations for f in v.fine_amount_all_other_areas})
+    )
+
+    totals = np.array([[getattr(v, f) for f in TOTAL_FIELDS] for v in violations], dtype=np.int64).sum(axis=0)
+    for f, total in zip(TOTAL_FIELDS, totals.tolist()):
+        setattr(v_all, f, total)
+    v_all.hour_dow_counts = v_all.hour_dow_counts + np.sum([v.hour_dow_counts for v in violations], axis=0)
+
+    for v in violations:
+        v_all.period_count = dict(sorted((Counter(v_all.period_count) + Counter(v.period_count)).items()))
+        v_all.period_fine = dict(sorted((Counter(v_all.period_fine) + Counter(v.period_fine)).items()))
+
+        for f in CATEGORY_COLUMNS:
+            merged = Counter(getattr(v_all, f)) + Counter(getattr(v, f))
+            setattr(v_all, f, dict(sorted(merged.items(), key=lambda x: x[1], reverse=True)))
+
+    return v_all
+
+
+def write_violation_data(violations: list[ViolationRecord], filepath: str | Path) -> None:
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump([v.to_dict() for v in violations], f)
@@ -0,0 +1,155 @@
+import functools
+import operator
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from pipeline.memory import batch_size_for
+from pipeline.records import partition_date
+from pipeline.writer import RECORD_SCHEMA, to_record_table
+
+
+# Records are laid out as `year=YYYY/month=M/violation=CODE/` directories, so a read of
+# some codes or months only opens their files. The violation is stored as its code in
+# the directory name, rather than its description in every record.
+PARTITION_SCHEMA = pa.schema([('year', pa.int16()), ('month', pa.int8()), ('violation', pa.int16())])
+VIOLATION_PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+DATASET_SCHEMA = pa.schema([f for f in RECORD_SCHEMA if f.name != 'violation'] + list(PARTITION_SCHEMA))
+
+DATASET_ROW_GROUP_SIZE = 100_000  # Records decoded at a time when reading
+
+
+def _with_partition_columns(table: pa.Table, violation_details: list[dict]) -> pa.Table:
+    """
+    `table` with its partition keys (by issue date and violation code) in place of the
+    violation description. Records without either are left out, as the aggregation
+    leaves them out too (e.g., "BLUE ZONE", which is no longer a valid violation).
+    """
+    descriptions = pa.array([v['description'] for v in violation_details], type=pa.string())
+    codes = pa.array([v['code'] for v in violation_details], type=PARTITION_SCHEMA.field('violation').type)
+
+    position = pc.index_in(table['violation'].cast(pa.string()), value_set=descriptions)
+    keep = pc.and_(pc.is_valid(position), pc.is_valid(table['issue_date']))
+    table, position = table.filter(keep), position.filter(keep)
+
+    return (table.drop_columns(['violation'])
+            .append_column(PARTITION_SCHEMA.field('year'), pc.year(table['issue_date']).cast(pa.int16()))
+            .append_column(PARTITION_SCHEMA.field('month'), pc.month(table['issue_date']).cast(pa.int8()))
+            .append_column(PARTITION_SCHEMA.field('violation'), codes.take(position)))
+
+
+def write_violation_dataset(filepaths: Iterable[str | Path],
+                            dataset_dir: str | Path,
+                            violation_details: list[dict],
+                            batch_size: int = 250_000,
+                            memory_limit: int | None = None) -> dict[str, int]:
+    """
+    Writes the stored partitions (one file per issue date, see `partition_filename`) to
+    the dataset at `dataset_dir`, one month at a time, and returns the records written
+    per month. A month written again replaces what it had: its directory is removed
+    first. Files are read `batch_size` records at a time, or as many as fit in
+    `memory_limit` (see `batch_size_for`), so a month is never held whole.
+    """
+    if memory_limit is not None:
+        batch_size = batch_size_for(memory_limit)
+
+    by_month = defaultdict(list)
+    for fp in sorted(filepaths):
+        by_month[partition_date(Path(fp).name)[:7]].append(fp)
+
+    file_options = ds.ParquetFileFormat().make_write_options(compression='snappy')
+    written = {}
+    for month, month_filepaths in sorted(by_month.items()):
+        year, m = month.split('-')
+        shutil.rmtree(Path(dataset_dir) / f'year={int(year)}' / f'month={int(m)}', ignore_errors=True)
+
+        written[month] = 0
+
+        def write(tables: list[pa.Table], part: int) -> None:
+            # Sorted, each partition's records arrive together and go to one file in one go
+            table = pa.concat_tables(tables).sort_by([(col, 'ascending') for col in [*PARTITION_SCHEMA.names, 'issue_date']])
+            ds.write_dataset(table, dataset_dir, format='parquet', partitioning=VIOLATION_PARTITIONING,
+                             basename_template=f'part-{part}-{{i}}.parquet', existing_data_behavior='overwrite_or_ignore',
+                             file_options=file_options, max_rows_per_group=DATASET_ROW_GROUP_SIZE)
+            written[month] += table.num_rows
+
+        # Up to `batch_size` records (across files) per write, each call finishing before
+        # the next batch is read; every write adds a file to each partition it has records of
+        pending, rows, part = [], 0, 0
+        for fp in month_filepaths:
+            for batch in pq.ParquetFile(fp).iter_batches(batch_size=batch_size):
+                pending.append(_with_partition_columns(to_record_table(pa.Table.from_batches([batch])), violation_details))
+                rows += batch.num_rows
+                if rows >= batch_size:
+                    write(pending, part)
+                    pending, rows, part = [], 0, part + 1
+        if pending:
+            write(pending, part)
+    return written
+
+
+def open_violation_dataset(dataset_dir: str | Path) -> ds.Dataset:
+    return ds.dataset(dataset_dir, schema=DATASET_SCHEMA, format='parquet', partitioning=VIOLATION_PARTITIONING)
+
+
+def dataset_filter(codes: Iterable[int] | None = None, months: Iterable[str] | None = None) -> ds.Expression | None:
+    """
+    Partitions of violation `codes` issued in `months` ('YYYY-MM'), e.g., code 21 in Q3
+    is `dataset_filter([21], ['2023-07', '2023-08', '2023-09'])`; None selects all
+    """
+    conditions = []
+    if codes is not None:
+        conditions.append(ds.field('violation').isin(list(codes)))
+    if months is not None:
+        by_year = defaultdict(list)
+        for month in months:
+            year, m = month.split('-')
+            by_year[int(year)].append(int(m))
+        conditions.append(functools.reduce(
+            operator.or_,
+            [(ds.field('year') == year) & ds.field('month').isin(ms) for year, ms in sorted(by_year.items())],
+            ds.scalar(False)))
+
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def iter_violation_dataset(dataset: ds.Dataset,
+                           violation_details: list[dict],
+                           columns: list[str],
+                           filter: ds.Expression | None = None,
+                           batch_size: int = 250_000) -> Iterator[pd.DataFrame]:
+    """
+    `columns` of the records matching `filter`, about `batch_size` at a time (the small
+    batches of separate files are combined); only the files of matching partitions are
+    opened, and only the columns asked for are read, without reading ahead. The
+    `violation` column is the description again, as in stored partitions.
+    """
+    descriptions = pd.Index([v['description'] for v in violation_details])
+    codes = np.array([v['code'] for v in violation_details])
+    position = np.full(codes.max() + 1, -1, dtype=np.int64)
+    position[codes] = np.arange(len(codes))
+
+    def to_frame(batches: list[pa.RecordBatch]) -> pd.DataFrame:
+        df = pa.Table.from_batches(batches).to_pandas()
+        if 'violation' in df:
+            df['violation'] = pd.Categorical.from_codes(position[df['violation'].to_numpy()], categories=descriptions)
+        return df
+
+    pending, rows = [], 0
+    for batch in dataset.to_batches(columns=columns, filter=filter, batch_size=batch_size,
+                                    batch_readahead=0, fragment_readahead=0):
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= batch_size:
+            yield to_frame(pending)
+            pending, rows = [], 0
+    if pending:
+        yield to_frame(pending)
@@ -0,0 +1,192 @@
+import codecs
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pipeline.records import SOURCE_COLUMNS, partition_filename
+from pipeline.writer import iter_json_array, write_records
+
+
+NYC_OPEN_DATA_TOKEN = os.getenv("NYC_OPEN_DATA_TOKEN")
+
+API_URL = "https://data.cityofnewyork.us/resource/nc67-uf89.json"
+PAGE_LIMIT = 100_000  # Records per request
+MANIFEST_NAME = 'nc67-uf89_fetch-manifest.jsonl'
+
+
+def issue_date_params(date: pd.Timestamp, limit: int = PAGE_LIMIT, offset: int = 0) -> dict:
+    """Socrata query for one page of the records issued on `date`, in either date format"""
+    date_iso = date.isoformat(timespec='milliseconds')
+    date_us = date.strftime('%m/%d/%Y')
+    return {
+        "$where": f"issue_date in('{date_us}', '{date_iso}')",
+        "$select": ", ".join(SOURCE_COLUMNS),
+        "$order": "summons_number ASC",
+        "$limit": limit,
+        "$offset": offset
+    }
+
+
+def fetch_violation_amounts_by_issue_date(date: pd.Timestamp, limit: int = PAGE_LIMIT, offset: int = 0, year: int = 2023, token: str = NYC_OPEN_DATA_TOKEN) -> list[dict]:
+    headers = {"X-App-Token": token}
+
+    response = requests.get(API_URL, params=issue_date_params(date, limit, offset), headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def persist_as_parquet(response_json, filepath: Path, overwrite: bool = False) -> None:
+    if filepath.exists() and not overwrite:
+        raise FileExistsError(f"The filename {filepath.name!r} already exists in directory {filepath.parent!r}!"
+                              "To overwrite file, set `overwrite=True`.")
+    write_records(response_json, filepath)
+
+
+class RateLimiter:
+    """Spaces out calls to `wait`, across threads, to at most `rate` per second"""
+    def __init__(self, rate: float):
+        self.interval: float = 1 / rate
+        self._next: float = 0.0  # When the next call may go ahead
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+class FetchManifest:
+    """
+    Pages already fetched, as one JSON line per page: its date, offset, number of
+    records and file. A date is done once it has a page shorter than the limit.
+    """
+    def __init__(self, filepath: str | Path):
+        self.filepath: Path = Path(filepath)
+        self.pages: dict[tuple[str, int], dict] = {}  # (date, offset) -> manifest entry
+        self._lock = threading.Lock()
+
+        if self.filepath.exists():
+            with open(self.filepath, 'r', encoding='utf-8') as fp:
+                for line in fp:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.pages[(entry['date'], entry['offset'])] = entry
+
+    def __repr__(self):
+        return f"FetchManifest(filepath={str(self.filepath)!r}, num_pages={len(self.pages)})"
+
+    def record(self, date: str, offset: int, rows: int, filename: str | None) -> None:
+        entry = {'date': date, 'offset': offset, 'rows': rows, 'file': filename}
+        with self._lock:
+            with open(self.filepath, 'a', encoding='utf-8') as fp:
+                fp.write(json.dumps(entry) + '\n')
+            self.pages[(date, offset)] = entry
+
+    def next_offset(self, date: str, limit: int) -> int | None:
+        """Offset of the first page of `date` still to fetch, or None if it is done"""
+        offset = 0
+        while (date, offset) in self.pages:
+            if self.pages[(date, offset)]['rows'] < limit:
+                return None
+            offset += limit
+        return offset
+
+
+class ViolationFetcher:
+    """
+    Fetches the records issued on each date from the Socrata API, `workers` dates at a
+    time over one pooled session, at most `rate` requests per second. Every date is
+    paged through `limit` records at a time until a short page comes back; each page
+    is saved as its own partition file and recorded in the manifest, so a rerun only
+    requests the pages it is missing.
+    """
+    def __init__(self,
+                 output_dir: str | Path,
+                 token: str | None = NYC_OPEN_DATA_TOKEN,
+                 url: str = API_URL,
+                 workers: int = 4,
+                 rate: float = 2.0,
+                 limit: int = PAGE_LIMIT,
+                 timeout: float = 120,
+                 retries: int = 3):
+        self.output_dir: Path = Path(output_dir)
+        self.url: str = url
+        self.workers: int = workers
+        self.limit: int = limit
+        self.timeout: float = timeout
+        self.manifest: FetchManifest = FetchManifest(self.output_dir / MANIFEST_NAME)
+        self.rate_limiter: RateLimiter = RateLimiter(rate)
+        self.errors: dict[str, Exception] = {}  # Date -> what stopped it, in the last `fetch_dates`
+
+        # Connections are reused across requests and threads; throttled and failed
+        # requests are retried with backoff
+        retry = Retry(total=retries, backoff_factor=2, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=('GET',))
+        self.session: requests.Session = requests.Session()
+        self.session.mount(url, HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry))
+        if token:
+            self.session.headers['X-App-Token'] = token
+
+    def __repr__(self):
+        return f"ViolationFetcher(url={self.url!r}, workers={self.workers}, manifest={self.manifest!r})"
+
+    def fetch_page(self, date: pd.Timestamp, offset: int, filepath: Path) -> int:
+        """
+        Streams one page into `filepath` (see `write_records`), parsing records as they
+        arrive rather than decoding the whole response first; returns how many it held
+        """
+        self.rate_limiter.wait()
+        params = issue_date_params(date, self.limit, offset)
+        with self.session.get(self.url, params=params, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = codecs.iterdecode(response.iter_content(chunk_size=1 << 16), 'utf-8')
+            return write_records(iter_json_array(chunks), filepath)
+
+    def fetch_date(self, date: pd.Timestamp) -> int:
+        """Fetches the pages of `date` not in the manifest, and returns how many records they held"""
+        date_str = date.strftime('%Y-%m-%d')
+        offset = self.manifest.next_offset(date_str, self.limit)
+
+        rows = 0
+        while offset is not None:
+            filename = partition_filename(date_str, offset)
+            page_rows = self.fetch_page(date, offset, self.output_dir / filename)
+            self.manifest.record(date_str, offset, page_rows, filename if page_rows else None)
+
+            rows += page_rows
+            offset = offset + self.limit if page_rows == self.limit else None
+        return rows
+
+    def fetch_dates(self, dates: Iterable[pd.Timestamp]) -> dict[str, int]:
+        """
+        Records fetched per date; dates that failed are left out and their exceptions
+        kept in `errors`, to be retried by the next call
+        """
+        self.errors = {}
+        dates = list(dates)
+
+        def fetch(date: pd.Timestamp) -> int | Exception:
+            try:
+                return self.fetch_date(date)
+            except Exception as e:
+                return e
+
+        fetched = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            for date, result in zip(dates, pool.map(fetch, dates)):
+                if isinstance(result, Exception):
+                    self.errors[date.strftime('%Y-%m-%d')] = result
+                else:
+                    fetched[date.strftime('%Y-%m-%d')] = result
+        return fetched
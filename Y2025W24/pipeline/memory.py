@@ -0,0 +1,44 @@
+import resource
+import sys
+
+
+# Aggregation holds one batch of records at a time plus compact per-code state, so its
+# memory is about a fixed baseline plus a cost per record in the batch (measured at
+# ~100 MiB and 150-250 bytes on 2M synthetic records; both are rounded up here). A memory
+# limit only sizes batches and worker counts from these estimates: it is a heuristic, not
+# a cap, and nothing stops a process that needs more than its share (e.g., with much
+# longer strings than measured), see `peak_rss` for what a run actually used.
+BASELINE_BYTES = 256 * 2**20  # Interpreter, pandas and pyarrow, and a parquet row group being read
+RECORD_BYTES = 512  # Per record of the batch: its frame, parsed columns and aggregation indexes
+MIN_BATCH_SIZE = 10_000  # Below this, per-batch overhead dominates
+MAX_BATCH_SIZE = 1_000_000  # Above this, larger batches are no faster
+
+
+def peak_rss(children: bool = False) -> int:
+    """
+    Peak resident set size of this process in bytes, or with `children` the largest of
+    its finished child processes (e.g., the workers of a closed process pool)
+    """
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024  # KiB on Linux
+
+
+def batch_size_for(memory_limit: int, processes: int = 1) -> int:
+    """
+    Records per batch that should keep each of `processes` processes within an even
+    share of `memory_limit` bytes, by the estimates above (not enforced)
+    """
+    batch_size = min((memory_limit // processes - BASELINE_BYTES) // RECORD_BYTES, MAX_BATCH_SIZE)
+    if batch_size < MIN_BATCH_SIZE:
+        raise MemoryError(f"A memory limit of {memory_limit / 2**20:,.0f} MiB is too low for {processes} process(es); "
+                          f"each needs at least {(BASELINE_BYTES + MIN_BATCH_SIZE * RECORD_BYTES) / 2**20:,.0f} MiB")
+    return batch_size
+
+
+def workers_for(memory_limit: int, workers: int) -> int:
+    """
+    At most `workers` pool processes, fewer if `memory_limit` cannot hold that many
+    (and this process) with batches of `MIN_BATCH_SIZE`; 1 for none, i.e., in this process
+    """
+    fits = memory_limit // (BASELINE_BYTES + MIN_BATCH_SIZE * RECORD_BYTES)
+    return min(workers, fits - 1) if workers > 1 and fits > 2 else 1
@@ -0,0 +1,57 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def ordered_map(func: Callable[[T], R],
+                items: Iterable[T],
+                workers: int | None = None,
+                max_pending: int | None = None) -> Iterator[R]:
+    """
+    `func` of each item, computed by a pool of `workers` processes (all CPUs by default,
+    or in this process if 1) and yielded in the order of `items`. At most `max_pending`
+    items are in flight or waiting to be consumed, which bounds the memory held by
+    results.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(func, items)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for item in items:
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            pending.append(pool.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def tree_reduce(items: Iterable[T], merge: Callable[[T, T], T]) -> T | None:
+    """
+    Combines `items` pairwise in a balanced tree as they arrive, holding at most one
+    partial per level. The tree only depends on the number of items, so the result
+    (e.g., of float sums) is the same however the items were computed.
+    """
+    stack: list[tuple[int, T]] = []  # (number of items merged, partial)
+    for item in items:
+        size = 1
+        while stack and stack[-1][0] == size:
+            left_size, left = stack.pop()
+            item = merge(left, item)
+            size += left_size
+        stack.append((size, item))
+
+    if not stack:
+        return None
+    _, result = stack.pop()
+    while stack:
+        _, left = stack.pop()
+        result = merge(left, result)
+    return result
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+
+# Each column holds few distinct strings (a year of dates, ~1,400 times of day), so they
+# are parsed once per distinct value and mapped back to the records by index. Distinct
+# values are parsed with array arithmetic on their characters when they have the API's
+# usual layout, and by pandas, exactly as before, when they do not; both give NaT/-1 for
+# invalid values, the way `errors='coerce'` did.
+
+def _factorize(values: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Index into the distinct values per record (-1 for blanks), and the distinct values"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(values)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _char_codes(strings: np.ndarray, width: int) -> np.ndarray:
+    """(n, width) code points of `strings`, zero-padded (and truncated, see the length check)"""
+    chars = np.zeros((len(strings), width), dtype=np.uint32)
+    if len(strings):
+        fixed = np.asarray(strings, dtype=f'U{width}')
+        chars[:] = fixed.view(np.uint32).reshape(len(strings), width)
+    return chars
+
+
+def _digits(chars: np.ndarray, columns: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """Number spelled by the digits in `columns`, and whether they all are digits"""
+    digits = chars[:, columns].astype(np.int64) - ord('0')
+    valid = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    return digits @ (10 ** np.arange(len(columns) - 1, -1, -1)), valid
+
+
+def _str_lengths(strings: np.ndarray) -> np.ndarray:
+    return np.array([len(s) if isinstance(s, str) else -1 for s in strings], dtype=np.int64)
+
+
+def _hours(strings: np.ndarray) -> np.ndarray:
+    """Hour (0-23) of each `HH:MMA`/`HH:MMP` time, or -1 where it has any other layout"""
+    chars = _char_codes(strings, 6)
+    hh, hh_valid = _digits(chars, [0, 1])
+    mm, mm_valid = _digits(chars, [3, 4])
+    meridiem = chars[:, 5] | 0x20  # Lowercase
+    pm = meridiem == ord('p')
+
+    valid = ((_str_lengths(strings) == 6) & hh_valid & mm_valid & (chars[:, 2] == ord(':'))
+             & (hh >= 1) & (hh <= 12) & (mm <= 59) & ((meridiem == ord('a')) | pm))
+    return np.where(valid, hh % 12 + 12 * pm, -1)
+
+
+def _days(strings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Milliseconds since the epoch of each `MM/DD/YYYY` or `YYYY-MM-DDTHH:MM:SS.fff`
+    timestamp, and whether it has either layout (and is a real date and time)
+    """
+    chars = _char_codes(strings, 23)
+    lengths = _str_lengths(strings)
+
+    def at(*columns: int) -> np.ndarray:
+        return np.logical_and.reduce([chars[:, c] == ord(s) for c, s in columns])
+
+    # US-style
+    us_month, us_month_valid = _digits(chars, [0, 1])
+    us_day, us_day_valid = _digits(chars, [3, 4])
+    us_year, us_year_valid = _digits(chars, [6, 7, 8, 9])
+    us = (lengths == 10) & at((2, '/'), (5, '/')) & us_month_valid & us_day_valid & us_year_valid
+
+    # ISO 8601
+    iso_year, iso_year_valid = _digits(chars, [0, 1, 2, 3])
+    iso_month, iso_month_valid = _digits(chars, [5, 6])
+    iso_day, iso_day_valid = _digits(chars, [8, 9])
+    hh, hh_valid = _digits(chars, [11, 12])
+    mm, mm_valid = _digits(chars, [14, 15])
+    ss, ss_valid = _digits(chars, [17, 18])
+    fff, fff_valid = _digits(chars, [20, 21, 22])
+    iso = ((lengths == 23) & at((4, '-'), (7, '-'), (10, 'T'), (13, ':'), (16, ':'), (19, '.'))
+           & iso_year_valid & iso_month_valid & iso_day_valid & hh_valid & mm_valid & ss_valid & fff_valid
+           & (hh <= 23) & (mm <= 59) & (ss <= 59))
+
+    year = np.where(us, us_year, iso_year)
+    month = np.where(us, us_month, iso_month)
+    day = np.where(us, us_day, iso_day)
+    time_ms = np.where(iso, ((hh * 60 + mm) * 60 + ss) * 1000 + fff, 0)
+
+    # Calendar dates only, e.g., no February 30th, within the years pandas can represent
+    valid = (us | iso) & (year >= 1678) & (year <= 2261) & (month >= 1) & (month <= 12) & (day >= 1)
+    first = (np.where(valid, year, 1970) - 1970).astype('datetime64[Y]') + np.where(valid, month - 1, 0).astype('timedelta64[M]')
+    month_days = ((first + np.timedelta64(1, 'M')).astype('datetime64[D]') - first.astype('datetime64[D]')).astype(np.int64)
+    valid &= day <= month_days
+
+    days = first.astype('datetime64[D]').astype(np.int64) + day - 1
+    return days * 86_400_000 + time_ms, valid
+
+
+def parse_violation_hour(values: pd.Series) -> np.ndarray:
+    """
+    Hour (0-23) of each `violation_time` (e.g., '09:41P'), or -1 where
+    `pd.to_datetime(values+'M', format='%I:%M%p', errors='coerce')` gives NaT
+    """
+    codes, uniques = _factorize(values)
+    hours = _hours(uniques)
+
+    fallback = hours < 0
+    if fallback.any():
+        times = pd.to_datetime(pd.Series(uniques[fallback], dtype=object)+'M', format='%I:%M%p', errors='coerce')
+        hours[fallback] = times.dt.hour.fillna(-1).to_numpy(dtype=np.int64)
+
+    return np.append(hours, -1).astype(np.int8)[codes]
+
+
+def parse_issue_date(values: pd.Series) -> np.ndarray:
+    """
+    `issue_date` as datetime64[ms], like `pd.to_datetime(values, format='mixed', errors='coerce')`
+    (values already stored as timestamps are passed through)
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype='datetime64[ms]')
+
+    codes, uniques = _factorize(values)
+    ms, valid = _days(uniques)
+    timestamps = np.where(valid, ms, np.datetime64('NaT').astype('datetime64[ms]').astype(np.int64)).view('datetime64[ms]')
+
+    fallback = ~valid
+    if fallback.any():
+        parsed = pd.to_datetime(pd.Series(uniques[fallback], dtype=object), format='mixed', errors='coerce')
+        timestamps[fallback] = parsed.to_numpy(dtype='datetime64[ms]')
+
+    return np.append(timestamps, np.datetime64('NaT', 'ms'))[codes]
+
+
+def day_of_week(dates: np.ndarray) -> np.ndarray:
+    """Day of the week of datetime64 `dates`, from 0 (Sunday) to 6 (Saturday); -1 for NaT"""
+    days = dates.astype('datetime64[D]')
+    return np.where(np.isnat(days), -1, (days.astype(np.int64) + 4) % 7).astype(np.int8)  # 1970-01-01 was a Thursday
@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from models import HOUR_DOW_COLUMNS, HOUR_DOW_ROWS
+from pipeline.parse import day_of_week, parse_issue_date, parse_violation_hour
+
+
+# Columns requested from the NYC Open Data API, in `$select` order
+SOURCE_COLUMNS = ['summons_number', 'issue_date', 'violation_time', 'violation',
+                  'fine_amount', 'penalty_amount', 'interest_amount', 'reduction_amount', 'payment_amount', 'amount_due',
+                  'violation_status', 'license_type', 'state', 'issuing_agency']
+
+AMOUNT_COLUMNS = ['fine_amount', 'penalty_amount', 'interest_amount', 'reduction_amount', 'payment_amount', 'amount_due']
+
+# `ViolationRecord` counter field -> column it counts
+CATEGORY_COLUMNS = {'statuses': 'violation_status',
+                    'agencies': 'issuing_agency',
+                    'states': 'state',
+                    'license_types': 'license_type'}
+MISSING_CATEGORY = 'none'  # Stands in for blank categories
+
+# What the aggregation reads from each partition
+AGGREGATE_COLUMNS = ['issue_date', 'violation_time', 'violation', *AMOUNT_COLUMNS, *CATEGORY_COLUMNS.values()]
+
+# Raw records are stored one file per issue date, plus one per further API page of that date
+PARTITION_PATTERN = 'nc67-uf89_issue-date_{date}_v2.parquet'
+
+
+def partition_filename(date: str, offset: int = 0) -> str:
+    return PARTITION_PATTERN.format(date=date if offset == 0 else f'{date}_o{offset}')
+
+
+def partition_date(filename: str) -> str:
+    """Issue date ('YYYY-MM-DD') of the partition stored as `filename`, see `partition_filename`"""
+    start = PARTITION_PATTERN.index('{date}')
+    return filename[start:start + 10]
+
+
+def read_partition(filepath: str | Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    `columns` of one stored partition; any the API left out (i.e., blank for every
+    record that day) are read as nulls
+    """
+    columns = columns or SOURCE_COLUMNS
+    stored = set(pq.read_schema(filepath).names)
+    df = pd.read_parquet(filepath, columns=[col for col in columns if col in stored])
+    for col in columns:
+        if col not in stored:
+            df[col] = None
+    return df[columns]
+
+
+def iter_partition(filepath: str | Path, columns: list[str] | None = None, batch_size: int = 250_000) -> Iterator[pd.DataFrame]:
+    """Like `read_partition`, but `batch_size` records at a time"""
+    columns = columns or SOURCE_COLUMNS
+    parquet_file = pq.ParquetFile(filepath)
+    stored = set(parquet_file.schema_arrow.names)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=[col for col in columns if col in stored]):
+        df = batch.to_pandas()
+        for col in columns:
+            if col not in stored:
+                df[col] = None
+        yield df[columns]
+
+
+def prepare_records(dff: pd.DataFrame) -> pd.DataFrame:
+    """
+    Types the raw string columns, drops records missing an issue date, time, violation
+    or fine, and adds the `hour` and `day_of_week` categories (see `pipeline.parse`).
+    `violation_time` is left as stored.
+    """
+    # Assign data types; partitions written with `RECORD_SCHEMA` already have them, but
+    # not those stored as the API's strings
+    issue_date = parse_issue_date(dff['issue_date'])
+    hour = parse_violation_hour(dff['violation_time'])
+    day = day_of_week(issue_date)
+
+    for col in AMOUNT_COLUMNS:
+        if dff[col].dtype != float:
+            dff[col] = dff[col].astype(float)
+
+    # Drop blanks
+    keep = (hour >= 0) & (day >= 0) & dff['violation'].notna().to_numpy() & dff['fine_amount'].notna().to_numpy()
+    dff = dff[keep].copy()
+    dff['issue_date'] = issue_date[keep]
+
+    # Labels only now, from the codes
+    dff['hour'] = pd.Categorical.from_codes(hour[keep], categories=HOUR_DOW_ROWS, ordered=True)
+    dff['day_of_week'] = pd.Categorical.from_codes(day[keep], categories=HOUR_DOW_COLUMNS, ordered=True)
+
+    return dff
+
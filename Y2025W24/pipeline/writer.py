@@ -0,0 +1,126 @@
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.parse import parse_issue_date
+from pipeline.records import AMOUNT_COLUMNS, CATEGORY_COLUMNS
+
+
+# Stored type of every API column, in `$select` order: dates already parsed, amounts as
+# floats, and repetitive strings (including the ~1,400 distinct times) dictionary-encoded
+RECORD_SCHEMA = pa.schema(
+    [('summons_number', pa.string()),
+     ('issue_date', pa.timestamp('ms')),
+     ('violation_time', pa.dictionary(pa.int32(), pa.string())),
+     ('violation', pa.dictionary(pa.int32(), pa.string()))]
+    + [(col, pa.float64()) for col in AMOUNT_COLUMNS]
+    + [(col, pa.dictionary(pa.int32(), pa.string())) for col in ['violation_status', 'license_type', 'state', 'issuing_agency']]
+)
+assert set(CATEGORY_COLUMNS.values()) <= set(RECORD_SCHEMA.names)
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[dict]:
+    """
+    Objects of a JSON array as they arrive in `chunks` of its text, e.g. from a streamed
+    response; raises ValueError if the text ends before the array's closing bracket
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    started = finished = False
+
+    for chunk in chunks:
+        buffer, pos = buffer[pos:] + chunk, 0
+        while not finished:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"Expected a JSON array, got {buffer[pos:pos + 20]!r}")
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                finished = True
+                break
+            try:
+                obj, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # Incomplete; wait for the next chunk
+            yield obj
+
+    if not finished:
+        raise ValueError(f"Truncated JSON array: {buffer[pos:pos + 20]!r}")
+
+
+def _array(values: list, field: pa.Field) -> pa.Array:
+    if field.name == 'issue_date':
+        # Either date format (see `issue_date_params`), unparseable ones as nulls
+        parsed = parse_issue_date(pd.Series(values, dtype=object))
+        return pa.array(parsed, type=field.type, from_pandas=True)
+    strings = pa.array(values, type=pa.string())
+    if pa.types.is_dictionary(field.type):
+        return strings.dictionary_encode()
+    return strings.cast(field.type)
+
+
+def records_to_batch(records: list[dict], schema: pa.Schema = RECORD_SCHEMA) -> pa.RecordBatch:
+    """Typed batch of API records; fields the API left out (it omits blanks) are nulls"""
+    return pa.RecordBatch.from_arrays([_array([r.get(f.name) for r in records], f) for f in schema], schema=schema)
+
+
+def to_record_table(table: pa.Table, schema: pa.Schema = RECORD_SCHEMA) -> pa.Table:
+    """
+    `table` of stored records cast to `schema`, e.g., a partition saved as the API's
+    strings; columns it does not have are nulls
+    """
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(len(table), field.type))
+            continue
+
+        column = table[field.name]
+        if column.type == field.type:
+            columns.append(column)
+        elif field.name == 'issue_date' and not pa.types.is_timestamp(column.type):
+            columns.append(pa.array(parse_issue_date(column.to_pandas()), type=field.type, from_pandas=True))
+        elif pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(column.type):
+            columns.append(column.cast(pa.string()).combine_chunks().dictionary_encode())
+        else:
+            columns.append(column.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_records(records: Iterable[dict], filepath: str | Path, batch_size: int = 10_000) -> int:
+    """
+    Writes `records` to a parquet file with `RECORD_SCHEMA`, `batch_size` at a time, so
+    only one batch is held in memory. The file is moved into place once complete, and
+    not written at all if there are no records (or if reading them fails). Returns the
+    number of records.
+    """
+    filepath = Path(filepath)
+    tmp_path = filepath.with_name(f'.{filepath.name}.tmp')
+    records = iter(records)
+
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, RECORD_SCHEMA, compression='snappy') as writer:
+            while batch := list(islice(records, batch_size)):
+                writer.write_batch(records_to_batch(batch))
+                rows += len(batch)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    if rows:
+        os.replace(tmp_path, filepath)
+    else:
+        os.remove(tmp_path)
+    return rows
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Callable, Hashable
+
+import flask
+from dash import Dash, Output
+from plotly.io.json import to_json_plotly
+
+
+class PrerenderedCallback:
+    """
+    Final JSON responses of a callback whose inputs can only take a few values, e.g.
+    one per violation code. Each response is rendered once (lazily or via `warm`) in
+    the same form Dash sends, and later requests for it are answered straight from the
+    cached bytes, skipping figure construction and Dash's callback dispatch.
+
+    `key` maps a request's `inputs` list to a cache key for `func`, or to None to
+    leave the request to Dash (e.g. for values it does not recognize).
+    """
+    def __init__(self,
+                 outputs: list[Output],
+                 func: Callable[[Hashable], tuple],
+                 key: Callable[[list], Hashable | None]):
+        self.outputs: list[Output] = outputs
+        self.func: Callable[[Hashable], tuple] = func
+        self.key: Callable[[list], Hashable | None] = key
+
+        # Callback ID Dash uses for these outputs, as sent in each request's `output`
+        self.output_id: str = '..' + '...'.join(f'{o.component_id}.{o.component_property}' for o in outputs) + '..'
+
+        self.hits: int = 0  # Served from the cache
+        self.misses: int = 0  # Rendered
+        self.build_seconds: float = 0.0  # Time spent rendering, in total
+
+        self._responses: dict[Hashable, bytes] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"PrerenderedCallback(output_id={self.output_id!r}, size={len(self._responses)}, "
+                f"hits={self.hits}, misses={self.misses})")
+
+    def info(self) -> dict[str, int | float]:
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._responses),
+                'bytes': sum(len(body) for body in self._responses.values()),
+                'build_seconds': self.build_seconds}
+
+    def render(self, key: Hashable) -> bytes:
+        """Response body for `key`, serialized the same way as Dash's multi-output responses"""
+        values = self.func(key)
+        response = {o.component_id: {o.component_property: v} for o, v in zip(self.outputs, values)}
+        return to_json_plotly({'multi': True, 'response': response}).encode()
+
+    def get(self, key: Hashable) -> bytes:
+        body = self._responses.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        start = time.perf_counter()
+        body = self.render(key)
+        with self._lock:
+            self.build_seconds += time.perf_counter() - start
+            self.misses += 1
+            self._responses[key] = body
+        return body
+
+    def warm(self, keys: list[Hashable]) -> None:
+        for key in keys:
+            if key not in self._responses:
+                self.get(key)
+
+    def intercept(self) -> flask.Response | None:
+        """`before_request` hook that answers this callback's requests from the cache"""
+        request = flask.request
+        if request.method != 'POST' or not request.path.endswith('/_dash-update-component'):
+            return None
+
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or body.get('output') != self.output_id:
+            return None
+
+        key = self.key(body.get('inputs', []))
+        if key is None:
+            return None
+        return flask.Response(self.get(key), mimetype='application/json')
+
+    def install(self, app: Dash) -> None:
+        app.server.before_request(self.intercept)
@@ -0,0 +1,211 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+# The violation data is compiled next to the source JSON (e.g., `data/nyc_parking_violation_data.store/`)
+# into one `.npy` array per column, which are memory-mapped rather than parsed on load:
+#   - scalar fields as one array each, totals as a single (n_codes, 7) matrix: int64, or
+#     float64 if any total is a float, so none is truncated
+#   - `hour_dow_counts` as a (n_codes, 24, 7) cube
+#   - list fields as flat values plus offsets per code
+#   - dict fields as a (n_codes, n_keys) matrix over a sorted key table, plus the key
+#     indices each code actually has (in their original order) laid out like list fields
+# A small manifest records which source file the arrays were built from, so editing
+# the JSON triggers a rebuild on the next load.
+SNAPSHOT_FORMAT = 3
+MANIFEST_NAME = 'manifest.json'
+STALE_SECONDS = 3600  # Temporary files older than this were left by a compile that never finished
+
+TEXT_FIELDS = ['description', 'definition']
+TOTAL_FIELDS = ['total_count', 'total_fine', 'total_penalty', 'total_interest',
+                'total_reduction', 'total_payment', 'total_due']
+LIST_FIELDS = ['fine_amount_manhattan_96st_and_below', 'fine_amount_all_other_areas']
+HOUR_DOW_SHAPE = (24, 7)
+
+# Dict fields and the key table their columns refer to; both period series share one
+KEY_TABLES = {'period_count': 'periods',
+              'period_fine': 'periods',
+              'statuses': 'statuses',
+              'agencies': 'agencies',
+              'states': 'states',
+              'license_types': 'license_types'}
+DICT_FIELDS = list(KEY_TABLES)
+
+
+class ViolationSnapshot:
+    """
+    Memory-mapped violation data. Arrays are read-only views of the `.npy` files on
+    disk, so every worker process that opens the same snapshot shares the same pages.
+    """
+    def __init__(self, path: Path, arrays: dict[str, np.ndarray], manifest: dict):
+        self.path: Path = path  # Directory holding the arrays for this build
+        self.arrays: dict[str, np.ndarray] = arrays
+        self.manifest: dict = manifest
+
+    def __repr__(self):
+        return f"ViolationSnapshot(path={str(self.path)!r}, num_codes={self.manifest['num_codes']})"
+
+    @property
+    def version(self) -> str:
+        """Identifies the source data the snapshot was built from"""
+        return self.manifest['build']
+
+
+def default_snapshot_dir(filepath: str | Path) -> Path:
+    return Path(filepath).with_suffix('.store')
+
+
+def source_fingerprint(filepath: str | Path) -> dict:
+    stat = os.stat(filepath)
+    return {'name': Path(filepath).name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def build_id(filepath: str | Path) -> str:
+    """
+    Changes whenever the source file or the snapshot format does; names the snapshot
+    build made from it
+    """
+    source = source_fingerprint(filepath)
+    return f"{source['size']}-{source['mtime_ns']}-f{SNAPSHOT_FORMAT}"
+
+
+def _is_current(manifest: dict | None, filepath: str | Path) -> bool:
+    return (manifest is not None
+            and manifest.get('format') == SNAPSHOT_FORMAT
+            and manifest.get('source') == source_fingerprint(filepath))
+
+
+def _read_manifest(snapshot_dir: Path) -> dict | None:
+    try:
+        with open(snapshot_dir / MANIFEST_NAME, 'r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _is_stale(path: Path) -> bool:
+    """Whether temporary `path` is old enough to have been abandoned (False if already gone)"""
+    try:
+        return time.time() - path.stat().st_mtime > STALE_SECONDS
+    except FileNotFoundError:
+        return False
+
+
+def _number_array(values: list) -> np.ndarray:
+    """int64 unless any value is a float, so values round-trip with the same type"""
+    is_float = any(isinstance(x, float) for x in values)
+    return np.array(values, dtype=np.float64 if is_float else np.int64)
+
+
+def _offsets(lengths: list[int]) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+
+def snapshot_arrays(violation_data: list[dict]) -> dict[str, np.ndarray]:
+    """Columns of the snapshot for violation dicts as serialized by `ViolationRecord.to_dict`"""
+    arrays = {
+        'code': np.array([v['code'] for v in violation_data], dtype=np.int64),
+        'totals': _number_array([v[f] for v in violation_data for f in TOTAL_FIELDS]).reshape(-1, len(TOTAL_FIELDS)),
+        'hour_dow_counts': np.array([v['hour_dow_counts'] for v in violation_data],
+                                    dtype=np.float64).reshape(-1, *HOUR_DOW_SHAPE),
+    }
+    for field in TEXT_FIELDS:
+        arrays[field] = np.array([v[field] for v in violation_data], dtype=str)
+
+    for field in LIST_FIELDS:
+        arrays[f'{field}.values'] = _number_array([x for v in violation_data for x in v[field]])
+        arrays[f'{field}.offsets'] = _offsets([len(v[field]) for v in violation_data])
+
+    for table in dict.fromkeys(KEY_TABLES.values()):
+        keys = sorted({k for f, t in KEY_TABLES.items() if t == table for v in violation_data for k in v[f]})
+        arrays[f'{table}.keys'] = np.array(keys, dtype=str)
+
+    for field, table in KEY_TABLES.items():
+        key_index = {k: i for i, k in enumerate(arrays[f'{table}.keys'].tolist())}
+        lengths = [len(v[field]) for v in violation_data]
+        index = np.array([key_index[k] for v in violation_data for k in v[field]], dtype=np.int32)
+        values = _number_array([x for v in violation_data for x in v[field].values()])
+
+        matrix = np.zeros((len(violation_data), len(key_index)), dtype=values.dtype)
+        matrix[np.repeat(np.arange(len(violation_data)), lengths), index] = values
+        arrays[field] = matrix
+        arrays[f'{field}.index'] = index
+        arrays[f'{field}.offsets'] = _offsets(lengths)
+
+    return arrays
+
+
+def compile_violation_snapshot(filepath: str | Path, snapshot_dir: str | Path | None = None) -> dict:
+    """
+    Parses the source JSON once and writes its columns to the snapshot. Each build goes
+    to its own subdirectory and the manifest is swapped in atomically, so workers that
+    already mapped a previous build keep reading valid arrays. Returns the new manifest.
+    """
+    snapshot_dir = Path(snapshot_dir) if snapshot_dir else default_snapshot_dir(filepath)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    source = source_fingerprint(filepath)
+    build = build_id(filepath)
+
+    with open(filepath, 'r', encoding='utf-8') as fp:
+        arrays = snapshot_arrays(json.load(fp))
+
+    build_dir = Path(tempfile.mkdtemp(prefix='.build-', dir=snapshot_dir))
+    for name, array in arrays.items():
+        np.save(build_dir / f'{name}.npy', array)
+
+    # Another worker may have finished the same build first; either copy is fine
+    try:
+        os.rename(build_dir, snapshot_dir / build)
+    except OSError:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    manifest = {'format': SNAPSHOT_FORMAT,
+                'build': build,
+                'source': source,
+                'num_codes': len(arrays['code']),
+                'arrays': sorted(arrays)}
+
+    previous = _read_manifest(snapshot_dir)
+    fd, tmp_manifest = tempfile.mkstemp(prefix='.manifest-', dir=snapshot_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(tmp_manifest, snapshot_dir / MANIFEST_NAME)
+
+    # Drop older builds, keeping the one just replaced until the next swap, since other
+    # processes may have read its manifest but not mapped its arrays yet (arrays already
+    # mapped stay readable regardless); and the leftovers of compiles that failed midway
+    keep = {build, previous.get('build') if previous else None}
+    for path in snapshot_dir.iterdir():
+        if not path.name.startswith('.'):
+            if path.is_dir() and path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+        elif path.name.startswith(('.build-', '.manifest-')) and _is_stale(path):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+    return manifest
+
+
+def open_violation_snapshot(filepath: str | Path, snapshot_dir: str | Path | None = None) -> ViolationSnapshot:
+    """
+    Memory-maps the compiled violation data, (re)building it first if it is missing or
+    out of date with the source JSON.
+    """
+    snapshot_dir = Path(snapshot_dir) if snapshot_dir else default_snapshot_dir(filepath)
+
+    manifest = _read_manifest(snapshot_dir)
+    if not _is_current(manifest, filepath) or not (snapshot_dir / manifest['build']).is_dir():
+        manifest = compile_violation_snapshot(filepath, snapshot_dir)
+
+    build_dir = snapshot_dir / manifest['build']
+    arrays = {name: np.load(build_dir / f'{name}.npy', mmap_mode='r') for name in manifest['arrays']}
+
+    return ViolationSnapshot(build_dir, arrays, manifest)
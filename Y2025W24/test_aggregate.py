@@ -0,0 +1,213 @@
+"""
+Checks the incremental aggregation against the notebook's original pandas aggregation
+on synthetic partitions, e.g. `python -m pytest Y2025W24/test_aggregate.py`
+"""
+import json
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models import HOUR_DOW_COLUMNS, HOUR_DOW_ROWS, ViolationRecord
+from pipeline.aggregate import ViolationAggregator, all_violations_record
+from pipeline.dataset import write_violation_dataset
+from pipeline.records import AMOUNT_COLUMNS, partition_filename
+from pipeline.writer import write_records
+
+
+CODES_JSON = Path(__file__).resolve().parent / 'data' / 'nyc_parking_violation_codes.json'
+
+# A week (from Monday, January 30th) spanning two months, and a month of its own
+DATES = [*pd.date_range('2023-01-27', '2023-02-03'), pd.Timestamp('2023-03-31')]
+RECORDS_PER_DATE = 400
+
+
+@pytest.fixture(scope='module')
+def violation_details() -> list[dict]:
+    with open(CODES_JSON, 'r', encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def synthetic_day(date: pd.Timestamp, descriptions: list[str], rng: np.random.Generator) -> list[dict]:
+    """
+    Records issued on `date` as the API returns them: strings, blanks left out, issue
+    dates in either format, a few unparseable dates and times, and violations that are
+    not in the registry ("BLUE ZONE") or blank
+    """
+    n = RECORDS_PER_DATE
+    issue_dates = np.array([date.strftime('%m/%d/%Y'), date.isoformat(timespec='milliseconds'), 'garbage', None], dtype=object)
+    times = np.array([f'{h:02}:{m:02}{p}' for h in range(1, 13) for m in (0, 15, 59) for p in 'AP'] + ['13:10P', None], dtype=object)
+    violations = np.array(descriptions[:12] + ['BLUE ZONE', None], dtype=object)
+    cents = np.array(['0', '10', '10.25', '32.5', '0.01', None], dtype=object)
+
+    columns = {
+        'summons_number': [f"{date.strftime('%Y%m%d')}{i:04}" for i in range(n)],
+        'issue_date': issue_dates[rng.choice(4, n, p=[0.49, 0.49, 0.01, 0.01])],
+        'violation_time': times[rng.choice(len(times), n)],
+        'violation': violations[rng.choice(len(violations), n)],
+        'fine_amount': np.array(['35', '65', '115', '115.55', '250', None], dtype=object)[rng.choice(6, n, p=[0.2, 0.2, 0.2, 0.2, 0.19, 0.01])],
+        **{col: cents[rng.choice(len(cents), n)] for col in AMOUNT_COLUMNS if col != 'fine_amount'},
+        'violation_status': np.array(['HEARING HELD-GUILTY', 'HEARING HELD-NOT GUILTY', None], dtype=object)[rng.choice(3, n)],
+        'license_type': np.array(['PAS', 'COM', None], dtype=object)[rng.choice(3, n)],
+        'state': np.array(['NY', 'NJ', 'PA'], dtype=object)[rng.choice(3, n)],
+        'issuing_agency': np.array(['TRAFFIC', 'DEPARTMENT OF TRANSPORTATION', None], dtype=object)[rng.choice(3, n)],
+    }
+    return [{k: v[i] for k, v in columns.items() if v[i] is not None} for i in range(n)]
+
+
+@pytest.fixture(scope='module')
+def raw_records(violation_details) -> dict[str, list[dict]]:
+    """Synthetic API records per issue date"""
+    rng = np.random.default_rng(0)
+    descriptions = [v['description'] for v in violation_details]
+    return {date.strftime('%Y-%m-%d'): synthetic_day(date, descriptions, rng) for date in DATES}
+
+
+@pytest.fixture(scope='module')
+def partitions(raw_records, tmp_path_factory) -> list[Path]:
+    """The records stored one file per issue date, as `ViolationFetcher` stores them"""
+    output_dir = tmp_path_factory.mktemp('partitions')
+    filepaths = []
+    for date, records in raw_records.items():
+        filepaths.append(output_dir / partition_filename(date))
+        write_records(records, filepaths[-1])
+    return filepaths
+
+
+def reference_records(raw_records: dict[str, list[dict]], violation_details: list[dict]) -> list[ViolationRecord]:
+    """The notebook's original transform (`load_parquets_by_month`) and aggregation, month by month"""
+    hours = ['12 AM'] + [f'{h} AM' for h in range(1, 12)] + ['12 PM'] + [f'{h} PM' for h in range(1, 12)]
+    days_map = {6: 'Sun', 0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat'}
+    assert hours == list(HOUR_DOW_ROWS) and list(days_map.values()) == list(HOUR_DOW_COLUMNS)
+
+    violations = {v['description']: ViolationRecord.from_dict(v) for v in violation_details}
+
+    for month in sorted({date[:7] for date in raw_records}):
+        dff = pd.concat([pd.DataFrame(records) for date, records in raw_records.items() if date.startswith(month)])
+
+        dff['issue_date'] = pd.to_datetime(dff['issue_date'], format='mixed', errors='coerce')
+        dff['violation_time'] = pd.to_datetime(dff['violation_time']+'M', format='%I:%M%p', errors='coerce')
+        for col in ['fine_amount', 'penalty_amount', 'interest_amount', 'reduction_amount', 'payment_amount', 'amount_due']:
+            dff[col] = dff[col].astype(float)
+        dff.dropna(subset=['issue_date', 'violation_time', 'violation', 'fine_amount'], inplace=True)
+        dff['hour'] = dff['violation_time'].dt.strftime('%I %p').str.replace(r'^0', '', regex=True)
+        dff['hour'] = pd.Categorical(dff['hour'], categories=hours, ordered=True)
+        dff['day_of_week'] = dff['issue_date'].dt.day_of_week.map(days_map)
+        dff['day_of_week'] = pd.Categorical(dff['day_of_week'], categories=days_map.values(), ordered=True)
+        df_m = dff
+
+        for col in ['violation_status', 'issuing_agency', 'state', 'license_type']:
+            df_m[col] = df_m[col].fillna('none')
+
+        df_m['period'] = df_m['issue_date'].dt.to_period('W').dt.start_time.dt.date.transform(lambda x: x.isoformat())
+        df_m['count'] = 1
+
+        counts = df_m['violation'].value_counts()
+        period_count = df_m.groupby(['violation', 'period'])['count'].sum()
+        period_fine = df_m.groupby(['violation', 'period'])['fine_amount'].sum()
+        amounts = df_m.groupby('violation')[[col for col in df_m.columns if col.find('amount')!= -1]].sum().round(0).astype(int)
+        hour_dow_counts = df_m.groupby(['violation', 'hour', 'day_of_week'], observed=False)['count'].sum().astype(int).reset_index().pivot(index=['violation', 'hour'], columns='day_of_week', values='count')
+
+        statuses = df_m.groupby(['violation', 'violation_status'])['count'].sum()
+        agencies = df_m.groupby(['violation', 'issuing_agency'])['count'].sum()
+        states = df_m.groupby(['violation', 'state'])['count'].sum()
+        license_types = df_m.groupby(['violation', 'license_type'])['count'].sum()
+
+        for v_key in df_m['violation'].unique():
+            if v_key not in violations.keys():
+                continue
+
+            v = violations[v_key]
+
+            v.total_count += int(counts.loc[v_key])
+            v.period_count.update(period_count.loc[v_key].to_dict())
+            v.period_fine.update(period_fine.loc[v_key].to_dict())
+
+            v.total_fine += amounts.loc[v_key].get('fine_amount').item()
+            v.total_penalty += amounts.loc[v_key].get('penalty_amount').item()
+            v.total_interest += amounts.loc[v_key].get('interest_amount').item()
+            v.total_reduction += amounts.loc[v_key].get('reduction_amount').item()
+            v.total_payment += amounts.loc[v_key].get('payment_amount').item()
+            v.total_due += amounts.loc[v_key].get('amount_due').item()
+
+            v.hour_dow_counts += hour_dow_counts.loc[v_key].values
+
+            v.statuses = dict(Counter(statuses.loc[v_key].to_dict()) + Counter(v.statuses))
+            v.agencies = dict(Counter(agencies.loc[v_key].to_dict()) + Counter(v.agencies))
+            v.states = dict(Counter(states.loc[v_key].to_dict()) + Counter(v.states))
+            v.license_types = dict(Counter(license_types.loc[v_key].to_dict()) + Counter(v.license_types))
+
+    return list(violations.values())
+
+
+@pytest.fixture(scope='module')
+def expected(raw_records, violation_details) -> list[ViolationRecord]:
+    return reference_records(raw_records, violation_details)
+
+
+def assert_same_records(actual: list[ViolationRecord], expected: list[ViolationRecord]) -> None:
+    """
+    Field by field, dicts in the same order; `period_fine` up to cents, since the fine
+    sums are in whole cents rather than floats
+    """
+    assert [v.code for v in actual] == [v.code for v in expected]
+    assert sum(v.total_count for v in expected) > 0
+
+    for a, e in zip(actual, expected):
+        a, e = a.to_dict(), e.to_dict()
+        a_fine, e_fine = a.pop('period_fine'), e.pop('period_fine')
+        assert list(a_fine) == list(e_fine), a['description']
+        assert [round(x, 2) for x in a_fine.values()] == [round(x, 2) for x in e_fine.values()], a['description']
+        for f, value in e.items():
+            assert a[f] == value, (a['description'], f)
+            if isinstance(value, dict):
+                assert list(a[f]) == list(value), (a['description'], f)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ingest_files(partitions, violation_details, expected, workers):
+    aggregator = ViolationAggregator(violation_details)
+    assert aggregator.ingest_files(partitions, workers=workers, batch_size=150) == sorted(p.name for p in partitions)
+    assert_same_records(aggregator.to_records(), expected)
+    assert_same_records([all_violations_record(aggregator.to_records())], [all_violations_record(expected)])
+
+
+def test_save_load_and_resume(partitions, violation_details, expected, tmp_path):
+    aggregator = ViolationAggregator(violation_details)
+    aggregator.ingest_files(partitions[:4], workers=1)
+    aggregator.save(tmp_path / 'aggregates.npz')
+
+    loaded = ViolationAggregator.load(tmp_path / 'aggregates.npz', violation_details)
+    assert loaded.partitions == aggregator.partitions
+    assert_same_records(loaded.to_records(), aggregator.to_records())
+
+    # Only the partitions not merged before are read
+    assert loaded.ingest_files(partitions, workers=1) == sorted(p.name for p in partitions[4:])
+    assert loaded.ingest_files(partitions, workers=1) == []
+    assert_same_records(loaded.to_records(), expected)
+
+    loaded.save(tmp_path / 'aggregates.npz')
+    assert_same_records(ViolationAggregator.load(tmp_path / 'aggregates.npz', violation_details).to_records(), expected)
+
+
+def test_from_dataset(partitions, violation_details, expected, tmp_path):
+    write_violation_dataset(partitions, tmp_path / 'dataset', violation_details, batch_size=500)
+
+    aggregator = ViolationAggregator.from_dataset(tmp_path / 'dataset', violation_details, batch_size=700)
+    assert_same_records(aggregator.to_records(), expected)
+
+    # One code in one month: the same as that code's records of that month alone
+    v = next(v for v in expected if v.total_count)
+    sliced = ViolationAggregator.from_dataset(tmp_path / 'dataset', violation_details, codes=[v.code], months=['2023-02'])
+    assert list(sliced.months) == ['2023-02']
+    counts = sliced.months['2023-02'].counts
+    assert counts.sum() == counts[[d['code'] for d in violation_details].index(v.code)] > 0
+
+
+def test_load_rejects_other_codes(violation_details, tmp_path):
+    aggregator = ViolationAggregator(violation_details)
+    aggregator.save(tmp_path / 'aggregates.npz')
+    with pytest.raises(ValueError):
+        ViolationAggregator.load(tmp_path / 'aggregates.npz', violation_details[1:])
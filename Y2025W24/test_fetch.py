@@ -0,0 +1,196 @@
+"""
+Checks `ViolationFetcher` against a local stand-in for the Socrata endpoint, e.g.
+`python -m pytest Y2025W24/test_fetch.py`
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from pipeline.fetch import MANIFEST_NAME, FetchManifest, RateLimiter, ViolationFetcher
+from pipeline.records import partition_filename
+
+
+# Records per issue date served by the stand-in
+DATE_ROWS = {'2023-03-01': 25, '2023-03-02': 10, '2023-03-03': 3, '2023-03-04': 0}
+LIMIT = 10
+
+
+def source_records(date: str) -> list[dict]:
+    """The stand-in's records issued on `date`, alternating the API's two date formats"""
+    timestamp = pd.Timestamp(date)
+    issue_dates = [timestamp.strftime('%m/%d/%Y'), timestamp.isoformat(timespec='milliseconds')]
+    return [{'summons_number': f'{date}-{i:03}', 'issue_date': issue_dates[i % 2],
+             'violation': 'FIRE HYDRANT', 'fine_amount': '115'}
+            for i in range(DATE_ROWS[date])]
+
+
+class SocrataStandIn(BaseHTTPRequestHandler):
+    """
+    Serves pages of `source_records` for the `$where`, `$limit` and `$offset` of each
+    request, over HTTP/1.0 without a Content-Length, so a body cut short just ends.
+    `server.faults` holds what to do instead for the next requests: a status code to
+    fail with, or 'truncate' to send half the page.
+    """
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        date = re.search(r"'(\d{4}-\d{2}-\d{2})T", params['$where']).group(1)
+        offset, limit = int(params['$offset']), int(params['$limit'])
+
+        with self.server.lock:
+            self.server.requests.append((date, offset, self.headers.get('X-App-Token'), time.monotonic()))
+            fault = self.server.faults.pop(0) if self.server.faults else None
+
+        if isinstance(fault, int):
+            self.send_response(fault)
+            self.end_headers()
+            return
+
+        body = json.dumps(source_records(date)[offset:offset + limit]).encode()
+        if fault == 'truncate':
+            body = body[:len(body) // 2]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SocrataStandIn)
+    server.lock = threading.Lock()
+    server.requests = []  # (date, offset, token, when) of each request
+    server.faults = []
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/resource/nc67-uf89.json'
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def fetcher_for(server, output_dir, **kwargs) -> ViolationFetcher:
+    return ViolationFetcher(output_dir, **{'token': 'test-token', 'url': server.url, 'workers': 2,
+                                           'rate': 1000, 'limit': LIMIT, 'timeout': 5, **kwargs})
+
+
+def stored_records(output_dir, date: str) -> list[str]:
+    """Summons numbers in the stored partitions of `date`, in offset order"""
+    numbers = []
+    for offset in range(0, DATE_ROWS[date] + 1, LIMIT):
+        filepath = output_dir / partition_filename(date, offset)
+        if filepath.exists():
+            numbers += pq.read_table(filepath, columns=['summons_number'])['summons_number'].to_pylist()
+    return numbers
+
+
+def expected_records(date: str) -> list[str]:
+    return [r['summons_number'] for r in source_records(date)]
+
+
+def test_pages_until_short_page(server, tmp_path):
+    fetcher = fetcher_for(server, tmp_path)
+    fetched = fetcher.fetch_dates(pd.to_datetime(list(DATE_ROWS)))
+
+    assert fetched == DATE_ROWS
+    assert fetcher.errors == {}
+    for date in DATE_ROWS:
+        assert stored_records(tmp_path, date) == expected_records(date)
+
+    # A full page is followed by another; an empty one is recorded without a file
+    assert sorted((date, offset) for date, offset, *_ in server.requests) == [
+        ('2023-03-01', 0), ('2023-03-01', 10), ('2023-03-01', 20),
+        ('2023-03-02', 0), ('2023-03-02', 10), ('2023-03-03', 0), ('2023-03-04', 0)]
+    assert {token for _, _, token, _ in server.requests} == {'test-token'}
+    assert FetchManifest(tmp_path / MANIFEST_NAME).pages[('2023-03-02', 10)] == {
+        'date': '2023-03-02', 'offset': 10, 'rows': 0, 'file': None}
+    assert not (tmp_path / partition_filename('2023-03-04')).exists()
+
+    # Everything is in the manifest, so a rerun requests nothing
+    rerun = fetcher_for(server, tmp_path)
+    assert rerun.fetch_dates(pd.to_datetime(list(DATE_ROWS))) == {date: 0 for date in DATE_ROWS}
+    assert len(server.requests) == 7
+
+
+def test_resumes_after_partial_run(server, tmp_path):
+    date = pd.to_datetime(['2023-03-01'])
+    server.faults = [None, 500]  # The first page arrives, the second fails outright
+
+    fetcher = fetcher_for(server, tmp_path, retries=0)
+    assert fetcher.fetch_dates(date) == {}
+    assert list(fetcher.errors) == ['2023-03-01']
+    assert stored_records(tmp_path, '2023-03-01') == expected_records('2023-03-01')[:LIMIT]
+
+    del server.requests[:]
+    rerun = fetcher_for(server, tmp_path, retries=0)
+    assert rerun.fetch_dates(date) == {'2023-03-01': 15}
+    assert rerun.errors == {}
+    assert [offset for _, offset, *_ in server.requests] == [10, 20]
+    assert stored_records(tmp_path, '2023-03-01') == expected_records('2023-03-01')
+
+
+def test_retries_server_errors(server, tmp_path):
+    server.faults = [503]
+    fetcher = fetcher_for(server, tmp_path, workers=1)
+    assert fetcher.fetch_dates(pd.to_datetime(['2023-03-03'])) == {'2023-03-03': 3}
+    assert fetcher.errors == {}
+    assert [offset for _, offset, *_ in server.requests] == [0, 0]
+    assert stored_records(tmp_path, '2023-03-03') == expected_records('2023-03-03')
+
+
+def test_gives_up_after_retries(server, tmp_path):
+    server.faults = [500, 500]
+    fetcher = fetcher_for(server, tmp_path, workers=1, retries=1)
+    assert fetcher.fetch_dates(pd.to_datetime(['2023-03-03', '2023-03-02'])) == {'2023-03-02': 10}
+    assert list(fetcher.errors) == ['2023-03-03']
+    assert FetchManifest(tmp_path / MANIFEST_NAME).next_offset('2023-03-03', LIMIT) == 0
+
+
+def test_truncated_body_is_an_error(server, tmp_path):
+    date = pd.to_datetime(['2023-03-02'])
+    server.faults = ['truncate']
+
+    fetcher = fetcher_for(server, tmp_path)
+    assert fetcher.fetch_dates(date) == {}
+    assert isinstance(fetcher.errors['2023-03-02'], ValueError)
+    assert FetchManifest(tmp_path / MANIFEST_NAME).pages == {}
+    assert [p.name for p in tmp_path.iterdir()] == []
+
+    rerun = fetcher_for(server, tmp_path)
+    assert rerun.fetch_dates(date) == {'2023-03-02': 10}
+    assert stored_records(tmp_path, '2023-03-02') == expected_records('2023-03-02')
+
+
+def test_rate_limit(server, tmp_path):
+    fetcher = fetcher_for(server, tmp_path, workers=4, rate=20)
+    fetcher.fetch_dates(pd.to_datetime(list(DATE_ROWS)))
+
+    times = sorted(when for *_, when in server.requests)
+    assert len(times) == 7
+    assert times[-1] - times[0] >= 6 / 20 * 0.9
+
+
+def test_rate_limiter_spaces_out_threads():
+    limiter = RateLimiter(50)
+    times = []
+
+    def wait():
+        limiter.wait()
+        times.append(time.monotonic())
+
+    threads = [threading.Thread(target=wait) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(times) - min(times) >= 9 / 50 * 0.9
@@ -0,0 +1,60 @@
+"""
+Checks that violation data reads back from its snapshot as it was written, e.g.
+`python -m pytest Y2025W24/test_snapshot.py`
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from models import ViolationTable
+from snapshot import open_violation_snapshot
+
+
+DATA_JSON = Path(__file__).resolve().parent / 'data' / 'nyc_parking_violation_data.json'
+
+
+def assert_same_values(actual, expected):
+    """Equal, and of the same types throughout"""
+    assert type(actual) is type(expected), (actual, expected)
+    if isinstance(expected, dict):
+        assert list(actual) == list(expected)
+        for key, value in expected.items():
+            assert_same_values(actual[key], value)
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            assert_same_values(a, e)
+    else:
+        assert actual == expected
+
+
+def round_trip(violation_data: list[dict], tmp_path: Path) -> list[dict]:
+    filepath = tmp_path / 'violations.json'
+    with open(filepath, 'w', encoding='utf-8') as fp:
+        json.dump(violation_data, fp)
+    return [v.to_dict() for v in ViolationTable.from_snapshot(open_violation_snapshot(filepath))]
+
+
+@pytest.fixture(scope='module')
+def violation_data() -> list[dict]:
+    with open(DATA_JSON, 'r', encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def test_round_trip(violation_data, tmp_path):
+    actual = round_trip(violation_data, tmp_path)
+    for a, e in zip(actual, violation_data):
+        e = {**e, 'hour_dow_counts': [[float(x) for x in row] for row in e['hour_dow_counts']]}  # Stored as floats
+        assert_same_values(a, e)
+
+
+def test_float_totals_are_not_truncated(violation_data, tmp_path):
+    violation_data = [dict(v) for v in violation_data[:3]]
+    violation_data[1]['total_fine'] = 1234.56
+    violation_data[2]['total_payment'] = 0.5
+
+    actual = round_trip(violation_data, tmp_path)
+    assert [v['total_fine'] for v in actual] == [float(v['total_fine']) for v in violation_data]
+    assert [v['total_payment'] for v in actual] == [float(v['total_payment']) for v in violation_data]
+    assert actual[1]['total_fine'] == 1234.56 and actual[2]['total_payment'] == 0.5
@@ -0,0 +1,61 @@
+"""
+Checks the streamed JSON parsing and typed parquet writing of API pages, e.g.
+`python -m pytest Y2025W24/test_writer.py`
+"""
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from pipeline.writer import RECORD_SCHEMA, iter_json_array, write_records
+
+
+RECORDS = [{'summons_number': '1', 'issue_date': '03/01/2023', 'violation': 'FIRE HYDRANT', 'fine_amount': '115'},
+           {'summons_number': '2', 'issue_date': '2023-03-01T00:00:00.000', 'violation_time': '09:41P'},
+           {'summons_number': '3', 'violation': 'Brackets ] and [ in a string, and a comma,'}]
+
+
+def split(text: str, *positions: int) -> list[str]:
+    bounds = [0, *positions, len(text)]
+    return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize('text', [json.dumps(RECORDS), json.dumps(RECORDS, indent=2), ' \n' + json.dumps(RECORDS) + '\n'])
+def test_parses_every_chunking(text):
+    for position in range(len(text) + 1):
+        assert list(iter_json_array(split(text, position))) == RECORDS
+    assert list(iter_json_array(text)) == RECORDS  # One character at a time
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[\n]'])
+def test_empty_array(text):
+    assert list(iter_json_array([text])) == []
+
+
+@pytest.mark.parametrize('text', ['[{"a":1},', '[{"a":1}', '[{"a":1', '[', ' ', ''])
+def test_truncated_array_raises(text):
+    with pytest.raises(ValueError, match='Truncated'):
+        list(iter_json_array([text]))
+
+
+def test_not_an_array_raises():
+    with pytest.raises(ValueError, match='Expected a JSON array'):
+        list(iter_json_array(['{"error": true}']))
+
+
+def test_write_records(tmp_path):
+    filepath = tmp_path / 'page.parquet'
+    assert write_records(iter(RECORDS), filepath, batch_size=2) == len(RECORDS)
+
+    table = pq.read_table(filepath)
+    assert table.schema == RECORD_SCHEMA
+    assert table['summons_number'].to_pylist() == ['1', '2', '3']
+    assert table['fine_amount'].to_pylist() == [115.0, None, None]
+    assert [d and d.isoformat() for d in table['issue_date'].to_pylist()] == ['2023-03-01T00:00:00'] * 2 + [None]
+
+
+def test_write_records_nothing_written(tmp_path):
+    assert write_records([], tmp_path / 'page.parquet') == 0
+    with pytest.raises(ValueError):
+        write_records(iter_json_array(['[{"summons_number": "1"},']), tmp_path / 'page.parquet')
+    assert list(tmp_path.iterdir()) == []
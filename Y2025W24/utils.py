@@ -1,18 +1,20 @@
-
-import json
+import base64
 from pathlib import Path
 
-from models import Violation
+import numpy as np
+
+from models import ViolationTable
+from snapshot import open_violation_snapshot
 from layout.config import FONT_BODY
 
 
 # Data preparation
+# The JSON is compiled once into a memory-mapped snapshot (rebuilt whenever the JSON changes)
 DATA_DIR = Path('data')
-with open(DATA_DIR / 'nyc_parking_violation_data.json', 'r', encoding='utf-8') as fp:
-    violation_data = json.load(fp)
-
+VIOLATION_DATA_FILEPATH = DATA_DIR / 'nyc_parking_violation_data.json'
+VIOLATION_TABLE = ViolationTable.from_snapshot(open_violation_snapshot(VIOLATION_DATA_FILEPATH))
 
-VIOLATION_REGISTRY = [Violation.from_dict(v) for v in violation_data]
+VIOLATION_REGISTRY = list(VIOLATION_TABLE)  # `Violation` views, one per code
 
 
 def set_custom_template_as_default() -> None:
@@ -43,3 +45,15 @@ def format_number_si(value: float) -> str:
         return f"{value / 1_000:.3g}K"
     else:
         return str(int(value)) if value == int(value) else str(value)
+
+
+def typed_array(array: np.ndarray) -> dict[str, str]:
+    """
+    Plotly's typed array spec for `array`, i.e. its raw bytes in base64, which plotly.js
+    decodes straight into a typed array instead of parsing nested number lists
+    """
+    array = np.ascontiguousarray(array)
+    spec = {'dtype': array.dtype.str.lstrip('<|='), 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+    if array.ndim > 1:
+        spec['shape'] = ', '.join(str(n) for n in array.shape)
+    return spec
@@ -0,0 +1,36 @@
+"""
+Each week's app is a directory of modules importing each other by bare name (`models`,
+`utils`, ...), and some names repeat across weeks. When one pytest run collects tests
+of several weeks, each test module is imported with its own week's directory first on
+`sys.path` and the other weeks' modules dropped from `sys.modules`.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+
+ROOT = Path(__file__).resolve().parent
+
+
+def _week_dir(filepath: str | Path) -> Path | None:
+    """Week directory (e.g., `Y2025W24/`) holding `filepath`, if any"""
+    try:
+        parts = Path(filepath).resolve().relative_to(ROOT).parts
+    except ValueError:
+        return None
+    return ROOT / parts[0] if len(parts) > 1 else None
+
+
+def pytest_collectstart(collector):
+    if not isinstance(collector, pytest.Module) or (week_dir := _week_dir(collector.path)) is None:
+        return
+
+    for name, module in list(sys.modules.items()):
+        module_dir = _week_dir(getattr(module, '__file__', None) or ROOT)
+        if module_dir is not None and module_dir != week_dir:
+            del sys.modules[name]
+
+    if str(week_dir) in sys.path:
+        sys.path.remove(str(week_dir))
+    sys.path.insert(0, str(week_dir))